@@ -0,0 +1,90 @@
+"""
+Recall@k vs. latency of the IVF ANN index against exact scoring.
+
+Run from the repo root:
+    python -m benchmarks.bench_ann --count 200000 --dim 384
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from helpers.ann import IVFIndex
+from helpers.retrieval import VectorIndex, normalize_rows
+
+
+def clustered_vectors(count, dim, n_clusters=256, noise=0.35, seed=0):
+    """
+    Unit vectors drawn around random cluster centres, like embedded topics
+    """
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.normal(size=(n_clusters, dim)))
+    labels = rng.integers(0, n_clusters, size=count)
+    vectors = centres[labels] + noise * rng.normal(size=(count, dim)) / np.sqrt(dim)
+    return normalize_rows(vectors)
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    matrix = clustered_vectors(args.count + args.queries, args.dim)
+    queries, matrix = matrix[: args.queries], matrix[args.queries :]
+    index = VectorIndex(matrix, normalized=True)
+
+    start = time.perf_counter()
+    ann = IVFIndex.build(index.matrix, n_lists=args.n_lists)
+    build_seconds = time.perf_counter() - start
+
+    exact_rows, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        nearest, _ = index.search(query, k=args.k)
+        exact_times.append(time.perf_counter() - start)
+        exact_rows.append({row for row, _ in nearest})
+
+    results = {
+        "exact": {
+            "recall_at_k": 1.0,
+            "p50_ms": percentile_ms(exact_times, 50),
+            "p99_ms": percentile_ms(exact_times, 99),
+        }
+    }
+    for n_probe in args.n_probe:
+        hits, times = 0, []
+        for query, truth in zip(queries, exact_rows):
+            start = time.perf_counter()
+            rows, _ = ann.search(query, k=args.k, n_probe=n_probe)
+            times.append(time.perf_counter() - start)
+            hits += len(truth & set(rows.tolist()))
+        results[f"ivf_n_probe_{n_probe}"] = {
+            "recall_at_k": round(hits / (args.k * len(queries)), 4),
+            "p50_ms": percentile_ms(times, 50),
+            "p99_ms": percentile_ms(times, 99),
+        }
+
+    report = {
+        "count": args.count,
+        "dim": args.dim,
+        "k": args.k,
+        "n_lists": ann.n_lists,
+        "build_seconds": round(build_seconds, 3),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
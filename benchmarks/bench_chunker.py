@@ -0,0 +1,175 @@
+"""
+Chunker throughput: legacy whitespace word splitter vs. the tiktoken chunker.
+Also checks that chunking a file window by window gives the same chunk
+boundaries as chunking the whole text, on plain text and on text with
+multi-space and multi-newline runs (exit status 1 if not).
+
+Run from the repo root:
+    python -m benchmarks.bench_chunker --size-mb 8
+    python -m benchmarks.bench_chunker --size-mb 1 --check-window-chars 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from helpers.chunker import get_encoding, iter_file_chunks, iter_token_chunks
+
+WORDS = (
+    "electronics profit margin customer holiday uplift percent category growth "
+    "segment report quarterly revenue FSMA 204 compliance lot traceability 42% "
+    "the of and to in a is that for on with as by"
+).split()
+
+
+# blank-line indentation, trailing spaces and tabs: runs tiktoken splits as \s+(?!\S)
+WHITESPACE_RUNS = (".\n\n    ", ".  \n\n\n", ".\t\t", ".   ", ".\n  \n\t", ".\n\n\n\n        ")
+
+
+def synthetic_text(size_bytes, seed=0, whitespace_runs=False):
+    """
+    Random sentences from a small vocabulary, about size_bytes long.
+
+    whitespace_runs=True separates some sentences with multi-space and
+    multi-newline runs instead of ". " and ".\n\n".
+    """
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24)))
+        if whitespace_runs and rng.random() < 0.3:
+            sentence = sentence.capitalize() + rng.choice(WHITESPACE_RUNS)
+        else:
+            sentence = sentence.capitalize() + (".\n\n" if rng.random() < 0.1 else ". ")
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)
+
+
+def word_chunks(text, chunk_size=64, overlap=12):
+    """
+    The original task 8 splitter: whitespace words, stride chunk_size - overlap
+    """
+    words = text.split()
+    step = chunk_size - overlap
+    for idx in range(0, len(words), step):
+        chunk_text = " ".join(words[idx : idx + chunk_size]).strip()
+        if chunk_text:
+            yield chunk_text
+
+
+def _time(fn, repeats):
+    best, count = None, 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = sum(1 for _ in fn())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def boundary_mismatches(text, path, chunk_size, overlap, encoding, window_chars):
+    """
+    Chunks whose (start_char, end_char) differ between whole-text and windowed
+    chunking of text (saved at path)
+    """
+    whole = [
+        (c["start_char"], c["end_char"])
+        for c in iter_token_chunks(text, chunk_size, overlap, encoding)
+    ]
+    windowed = [
+        (c["start_char"], c["end_char"])
+        for c in iter_file_chunks(path, chunk_size, overlap, encoding, window_chars)
+    ]
+    mismatches = [i for i, (a, b) in enumerate(zip(whole, windowed)) if a != b]
+    mismatches += range(min(len(whole), len(windowed)), max(len(whole), len(windowed)))
+    return {
+        "window_chars": window_chars,
+        "chunks": len(whole),
+        "mismatched": len(mismatches),
+        "first_mismatch": mismatches[0] if mismatches else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--overlap", type=int, default=12)
+    parser.add_argument("--window-chars", type=int, default=1 << 20)
+    parser.add_argument("--repeats", type=int, default=3)
+    # small windows put many chunk boundaries at window edges
+    parser.add_argument(
+        "--check-window-chars", type=int, nargs="*", default=[965, 1000, 4099]
+    )
+    args = parser.parse_args()
+
+    text = synthetic_text(int(args.size_mb * 1024 * 1024))
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    encoding = get_encoding()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(text)
+        path = f.name
+    try:
+        cases = {
+            "word_split": lambda: word_chunks(text, args.chunk_size, args.overlap),
+            "tiktoken_in_memory": lambda: iter_token_chunks(
+                text, args.chunk_size, args.overlap, encoding
+            ),
+            "tiktoken_file_windows": lambda: iter_file_chunks(
+                path, args.chunk_size, args.overlap, encoding, args.window_chars
+            ),
+        }
+        results = {}
+        for name, fn in cases.items():
+            seconds, count = _time(fn, args.repeats)
+            results[name] = {
+                "seconds": round(seconds, 4),
+                "chunks": count,
+                "mb_per_s": round(size_mb / seconds, 2),
+            }
+        checks = [
+            dict(
+                boundary_mismatches(text, path, args.chunk_size, args.overlap, encoding, w),
+                text="plain",
+            )
+            for w in [args.window_chars] + args.check_window_chars
+        ]
+    finally:
+        os.remove(path)
+
+    # the same check on text full of whitespace runs, which window cuts can split
+    runs_text = synthetic_text(len(text), seed=1, whitespace_runs=True)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(runs_text)
+        runs_path = f.name
+    try:
+        checks += [
+            dict(
+                boundary_mismatches(
+                    runs_text, runs_path, args.chunk_size, args.overlap, encoding, w
+                ),
+                text="whitespace_runs",
+            )
+            for w in args.check_window_chars
+        ]
+    finally:
+        os.remove(runs_path)
+
+    print(
+        json.dumps(
+            {"size_mb": round(size_mb, 2), "results": results, "boundary_checks": checks},
+            indent=2,
+        )
+    )
+    if any(check["mismatched"] for check in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Memory saved and recall lost by int8 / binary quantized search with float32 rescoring.
+
+Uses the Task 8 vector store, so ingest the DR0001 corpus first:
+    python main.py -t task_8 --task-dir data/DR0001
+    python -m benchmarks.bench_quantization
+
+Without a store (or with --synthetic) clustered random vectors are used.
+Queries are held-out rows of the store, so recall is measured against exact
+search over the remaining rows.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import clustered_vectors, percentile_ms
+from helpers.quantization import QuantizedIndex
+from helpers.retrieval import VectorIndex, normalize_rows
+from helpers.vector_store import load_embeddings
+
+
+def load_matrix(args):
+    if not args.synthetic and os.path.exists(args.store):
+        matrix, header = load_embeddings(args.store)
+        source = args.store
+    else:
+        matrix, header = clustered_vectors(args.count, args.dim), {"normalized": True}
+        source = "synthetic"
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not header["normalized"]:
+        matrix = normalize_rows(matrix)
+    return matrix, source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", default="outputs/task_8_embeddings.npy")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--shortlist", type=int, nargs="+", default=[10, 30, 100, 300, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    matrix, source = load_matrix(args)
+    rng = np.random.default_rng(args.seed)
+    held_out = np.zeros(len(matrix), dtype=bool)
+    n_queries = min(args.queries, len(matrix) // 2)
+    held_out[rng.choice(len(matrix), size=n_queries, replace=False)] = True
+    queries, matrix = matrix[held_out], matrix[~held_out]
+    k = min(args.k, len(matrix))
+
+    index = VectorIndex(matrix, normalized=True)
+    quantized = QuantizedIndex.build(matrix)
+
+    exact_rows, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        nearest, _ = index.search(query, k=k)
+        exact_times.append(time.perf_counter() - start)
+        exact_rows.append({row for row, _ in nearest})
+
+    results = {
+        "exact": {
+            "recall_at_k": 1.0,
+            "p50_ms": percentile_ms(exact_times, 50),
+            "p99_ms": percentile_ms(exact_times, 99),
+        }
+    }
+    for kind in ("int8", "binary"):
+        for shortlist in args.shortlist:
+            hits, times = 0, []
+            for query, truth in zip(queries, exact_rows):
+                start = time.perf_counter()
+                rows, _ = quantized.search(query, k=k, kind=kind, shortlist=shortlist)
+                times.append(time.perf_counter() - start)
+                hits += len(truth & set(rows.tolist()))
+            results[f"{kind}_shortlist_{shortlist}"] = {
+                "recall_at_k": round(hits / (k * len(queries)), 4),
+                "p50_ms": percentile_ms(times, 50),
+                "p99_ms": percentile_ms(times, 99),
+            }
+
+    sizes = quantized.nbytes()
+    report = {
+        "source": source,
+        "count": len(matrix),
+        "dim": matrix.shape[1],
+        "queries": len(queries),
+        "k": k,
+        "bytes": sizes,
+        "memory_saved": {
+            kind: round(1 - sizes[kind] / sizes["float32"], 4) for kind in ("int8", "binary")
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
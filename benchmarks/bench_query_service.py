@@ -0,0 +1,119 @@
+"""
+Concurrent-load benchmark for helpers.query_service: many client threads
+query a QueryService and the p50/p99 latency and throughput are reported,
+with micro-batching on and off (max_batch_size=1).
+
+Run from the repo root:
+    python -m benchmarks.bench_query_service --clients 32 --queries 2000
+    python -m benchmarks.bench_query_service --synthetic --rows 100000
+
+Without --synthetic the Task 8 store and the real embedding model are used.
+--synthetic uses random embeddings and a stand-in encoder whose cost is a
+fixed per-call overhead plus a per-text cost, like a small transformer on CPU.
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+
+class SyntheticEncoder:
+    """
+    Deterministic random vectors with a simulated per-call and per-text cost
+    """
+
+    def __init__(self, dim, call_ms=4.0, text_ms=0.2):
+        self.dim = dim
+        self.call_s = call_ms / 1000
+        self.text_s = text_ms / 1000
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        time.sleep(self.call_s + self.text_s * len(texts))
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            rng = np.random.default_rng(abs(hash(text)) % 2**32)
+            vectors[i] = rng.standard_normal(self.dim, dtype=np.float32)
+        return vectors
+
+
+def load_store(args):
+    if args.synthetic:
+        from helpers.retrieval import VectorIndex, normalize_rows
+
+        rng = np.random.default_rng(0)
+        matrix = normalize_rows(rng.standard_normal((args.rows, args.dim), dtype=np.float32))
+        chunks = [{"chunk_id": str(i)} for i in range(args.rows)]
+        return chunks, VectorIndex(matrix, normalized=True), SyntheticEncoder(args.dim)
+
+    import helpers
+    from helpers.retrieval import VectorIndex
+    from helpers.vector_store import load_embeddings
+
+    chunks = helpers.load_json("outputs/task_8_chunks.json")
+    embeddings, header = load_embeddings("outputs/task_8_embeddings.npy")
+    return chunks, VectorIndex(embeddings, normalized=header["normalized"]), None
+
+
+def run_load(service, clients, queries, timeout):
+    # each client thread sends its share of the queries back to back
+    errors = []
+
+    def client(worker):
+        for i in range(worker, queries, clients):
+            try:
+                service.query(f"query {i} about supplier compliance", k=3, timeout=timeout)
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return wall, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    from helpers.query_service import QueryService
+
+    chunks, index, model = load_store(args)
+    report = {"rows": len(chunks), "clients": args.clients, "queries": args.queries}
+    for name, batch_size in (("unbatched", 1), ("batched", args.max_batch_size)):
+        service = QueryService(
+            chunks, index, model=model, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms
+        ).start()
+        wall, errors = run_load(service, args.clients, args.queries, args.timeout)
+        stats = service.stats()
+        service.close()
+        report[name] = {
+            "wall_s": round(wall, 3),
+            "queries_per_s": round(args.queries / wall, 1),
+            "p50_ms": stats["p50_ms"],
+            "p99_ms": stats["p99_ms"],
+            "mean_batch_size": stats["mean_batch_size"],
+            "timeouts": stats["timeouts"],
+            "errors": len(errors),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Throttling benchmark for helpers.rate_limit: many threads send chat calls
+through helpers.chat_completion to a simulated provider that answers 429
+above a concurrency cap, with the shared limiter on and off. Reports wall
+time, throttle events, failed calls and limiter queue wait.
+
+Run from the repo root:
+    python -m benchmarks.bench_rate_limit --clients 32 --calls 500 --server-concurrency 6
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+class SimulatedProvider:
+    """
+    Stand-in SDK client: fixed latency per call, 429 above max_concurrency in flight
+    """
+
+    def __init__(self, max_concurrency, latency_ms):
+        self.max_concurrency = max_concurrency
+        self.latency_s = latency_ms / 1000
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        # client.chat.completions.create, like the provider SDKs
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        with self._lock:
+            if self.in_flight >= self.max_concurrency:
+                self.rejected += 1
+                raise Throttled("rate limited")
+            self.in_flight += 1
+        try:
+            time.sleep(self.latency_s)
+            return {"choices": [], "usage": {"prompt_tokens": 20, "completion_tokens": 20}}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def run(args, rate_limit):
+    from helpers.clients import chat_completion
+    from helpers.rate_limit import _limiters, get_limiter, provider_of
+
+    provider = SimulatedProvider(args.server_concurrency, args.latency_ms)
+    # start every run from a fresh limiter
+    _limiters.pop(provider_of(provider), None)
+    failures = []
+
+    def call(i):
+        try:
+            chat_completion(
+                provider,
+                backoff=0.05,
+                rate_limit=rate_limit,
+                model="simulated",
+                messages=[{"role": "user", "content": f"question {i}"}],
+                max_tokens=64,
+            )
+        except Exception as e:
+            failures.append(type(e).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as executor:
+        list(executor.map(call, range(args.calls)))
+    wall = time.perf_counter() - start
+    result = {
+        "wall_s": round(wall, 3),
+        "calls_per_s": round(args.calls / wall, 1),
+        "throttled_attempts": provider.rejected,
+        "failed_calls": len(failures),
+    }
+    if rate_limit:
+        result["limiter"] = get_limiter(provider_of(provider)).get_stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--server-concurrency", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    # keep the simulated calls out of outputs/llm_metrics.jsonl
+    os.environ["LLM_METRICS_PATH"] = ""
+    report = {
+        "clients": args.clients,
+        "calls": args.calls,
+        "server_concurrency": args.server_concurrency,
+        "unlimited": run(args, rate_limit=False),
+        "rate_limited": run(args, rate_limit=True),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+CLI startup cost: runs `python -X importtime main.py --help` in fresh
+processes and reports wall time, total import time and the slowest imports.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup --repeats 5 --out startup.json
+
+Heavy libraries (together, flask, tiktoken, numpy, ...) should only show up
+when a stage that needs them runs, not at startup.
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = (
+    "together",
+    "flask",
+    "requests",
+    "httpx",
+    "tiktoken",
+    "numpy",
+    "sentence_transformers",
+    "torch",
+)
+
+_line_pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    (module, self_us, cumulative_us, depth) rows of -X importtime output
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _line_pattern.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def measure(command):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    return wall, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--command",
+        nargs="+",
+        default=["main.py", "--help"],
+        help="script and arguments to start (default: main.py --help)",
+    )
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    walls, totals, rows = [], [], []
+    for _ in range(args.repeats):
+        wall, rows = measure(args.command)
+        walls.append(wall)
+        # top-level rows' cumulative times cover every import
+        totals.append(sum(r[2] for r in rows if r[3] == 0))
+
+    imported = {r[0] for r in rows}
+    slowest = sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+    report = {
+        "command": args.command,
+        "python": sys.version.split()[0],
+        "repeats": args.repeats,
+        "wall_ms_median": round(statistics.median(walls) * 1000, 1),
+        "import_ms_median": round(statistics.median(totals) / 1000, 1),
+        "modules_imported": len(imported),
+        "heavy_modules_imported": [m for m in HEAVY_MODULES if m in imported],
+        "slowest_imports": [
+            {"module": m, "cumulative_ms": round(c / 1000, 1), "self_ms": round(s / 1000, 1)}
+            for m, s, c, _ in slowest
+        ],
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Saved startup timings to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
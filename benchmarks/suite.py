@@ -0,0 +1,349 @@
+"""
+Stage-level microbenchmarks: task 8 chunker, batched embedding, task 9
+scoring/top-k and LLM output parsing, over synthetic corpora.
+
+Run from the repo root:
+    python -m benchmarks.suite run --sizes 1000 10000 100000 --out bench.json
+    python -m benchmarks.suite compare base.json bench.json --threshold 0.1
+
+Sizes are corpus sizes in chunks; for the parse stage they are the length
+of the synthetic LLM response in characters.
+
+Each (stage, size) case runs in a fresh worker process, so its peak RSS is
+its own. Stages that need assets that are not available offline (the
+tiktoken encoding, the embedding model) are reported as "skipped".
+compare exits with status 1 when any p50 latency or peak RSS regressed by
+more than the threshold.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+SUITE_VERSION = 1
+STAGES = ("chunker", "encode", "retrieval", "parse")
+
+
+def summarize(samples):
+    """
+    Latency percentiles (ms) of a list of durations in seconds
+    """
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def synthetic_chunk_text(n_chunks, chunk_size=64, overlap=12, encoding=None):
+    """
+    Synthetic text that the task 8 chunker splits into about n_chunks chunks
+    """
+    from benchmarks.bench_chunker import synthetic_text
+    from helpers.chunker import iter_token_chunks
+
+    sample = synthetic_text(64 * 1024, seed=1)
+    sample_chunks = sum(1 for _ in iter_token_chunks(sample, chunk_size, overlap, encoding))
+    per_chunk = len(sample) / sample_chunks
+    return synthetic_text(int(per_chunk * n_chunks))
+
+
+def bench_chunker(size, args):
+    from helpers.chunker import get_encoding, iter_token_chunks
+
+    encoding = get_encoding()
+    text = synthetic_chunk_text(size, encoding=encoding)
+    samples, count = [], 0
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        count = sum(1 for _ in iter_token_chunks(text, 64, 12, encoding))
+        samples.append(time.perf_counter() - start)
+    best = min(samples)
+    return {
+        "timings": summarize(samples),
+        "chunks": count,
+        "chunks_per_s": round(count / best, 1),
+        "mb_per_s": round(len(text.encode("utf-8")) / (1024 * 1024) / best, 2),
+    }
+
+
+def bench_encode(size, args):
+    from benchmarks.bench_chunker import synthetic_text
+    from helpers.embedding_models import get_embedding_model
+
+    model = get_embedding_model(args.model)
+    n_texts = min(size, args.encode_limit)
+    words = synthetic_text(n_texts * 300, seed=2).split()
+    texts = [" ".join(words[i * 48 : i * 48 + 48]) for i in range(n_texts)]
+
+    model.encode(texts[: args.batch_size], batch_size=args.batch_size)  # warm-up
+    samples = []
+    start_all = time.perf_counter()
+    for start in range(0, n_texts, args.batch_size):
+        batch = texts[start : start + args.batch_size]
+        start_batch = time.perf_counter()
+        model.encode(batch, batch_size=args.batch_size, convert_to_numpy=True)
+        samples.append(time.perf_counter() - start_batch)
+    total = time.perf_counter() - start_all
+    return {
+        "timings": summarize(samples),
+        "texts": n_texts,
+        "batch_size": args.batch_size,
+        "texts_per_s": round(n_texts / total, 1),
+    }
+
+
+def bench_retrieval(size, args):
+    from helpers.retrieval import VectorIndex, normalize_rows
+
+    rng = np.random.default_rng(0)
+    matrix = np.empty((size, args.dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        block = rng.standard_normal((min(65536, size - start), args.dim), dtype=np.float32)
+        matrix[start : start + len(block)] = normalize_rows(block)
+    index = VectorIndex(matrix, normalized=True)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    index.search(queries[0], k=3, furthest_k=3)  # warm-up
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=3, furthest_k=3)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    index.search_batch(queries, k=3, furthest_k=3)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "timings": summarize(samples),
+        "rows": size,
+        "dim": args.dim,
+        "batch_queries_per_s": round(len(queries) / batch_seconds, 1),
+    }
+
+
+def synthetic_llm_outputs(size, seed=0):
+    """
+    An XML-tagged and a JSON insights response of roughly size characters each
+    """
+    from benchmarks.bench_chunker import synthetic_text
+
+    filler = synthetic_text(max(size, 64), seed=seed)
+    xml = f"Sure, here it is.\n<analysis>{filler}</analysis>\n<answer>{filler[:200]}</answer>"
+    n_insights = max(1, size // 200)
+    insights = [
+        {
+            "insight": filler[i * 100 : i * 100 + 100],
+            "justification": filler[i * 100 + 100 : i * 100 + 180],
+            "citation": f"task_7_file_1.txt_{i}",
+        }
+        for i in range(n_insights)
+    ]
+    json_text = "Here are the insights:\n" + json.dumps({"insights": insights}) + "\nDone."
+    return xml, json_text
+
+
+def bench_parse(size, args):
+    from helpers.llm_model import LlmModel
+    from helpers.rag import parse_json_output
+
+    # the parsers do not touch the provider client, so skip __init__
+    llm = LlmModel.__new__(LlmModel)
+    xml, json_text = synthetic_llm_outputs(size)
+    cases = {
+        "parse_xml_tags": lambda: llm.parse_xml_tags(xml, ["analysis", "answer"]),
+        "parse_json_output": lambda: parse_json_output(json_text),
+    }
+    results = {}
+    for name, fn in cases.items():
+        fn()
+        samples = []
+        for _ in range(args.parse_repeats):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+    # the p50 of the slowest parser is what compare looks at
+    slowest = max(results.values(), key=lambda r: r["p50_ms"])
+    return {"timings": slowest, "chars": len(json_text), "parsers": results}
+
+
+BENCHES = {
+    "chunker": bench_chunker,
+    "encode": bench_encode,
+    "retrieval": bench_retrieval,
+    "parse": bench_parse,
+}
+
+
+def _run_case(stage, size, args):
+    # runs in a worker process: peak RSS covers this case only
+    start = time.perf_counter()
+    try:
+        result = BENCHES[stage](size, args)
+        result["status"] = "ok"
+    except (ImportError, OSError) as e:
+        # missing optional dependency, or an asset that cannot be downloaded offline
+        result = {"status": "skipped", "reason": f"{type(e).__name__}: {e}"}
+    result.update(
+        stage=stage,
+        size=size,
+        wall_s=round(time.perf_counter() - start, 3),
+        peak_rss_bytes=peak_rss_bytes(),
+    )
+    return result
+
+
+def run(args):
+    context = multiprocessing.get_context("spawn")
+    config = {k: v for k, v in vars(args).items() if k not in ("func", "out")}
+    case_args = argparse.Namespace(**config)
+    results = []
+    for stage in args.stages:
+        for size in args.sizes:
+            with context.Pool(1) as pool:
+                result = pool.apply(_run_case, (stage, size, case_args))
+            results.append(result)
+            p50 = result.get("timings", {}).get("p50_ms")
+            print(
+                f"{stage:<10} size={size:<8} {result['status']:<8} "
+                f"p50={p50} ms peak_rss={result['peak_rss_bytes'] / 2**20:.1f} MiB",
+                file=sys.stderr,
+            )
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"Saved benchmark results to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    def by_case(report):
+        return {
+            (r["stage"], r["size"]): r for r in report["results"] if r["status"] == "ok"
+        }
+
+    base_cases, new_cases = by_case(base), by_case(new)
+    rows, regressions = [], 0
+    for case in sorted(base_cases.keys() & new_cases.keys()):
+        b, n = base_cases[case], new_cases[case]
+        for metric, old, cur in (
+            ("p50_ms", b["timings"]["p50_ms"], n["timings"]["p50_ms"]),
+            ("peak_rss_bytes", b["peak_rss_bytes"], n["peak_rss_bytes"]),
+        ):
+            if old:
+                ratio = cur / old
+            else:
+                ratio = float("inf") if cur else 1.0
+            if ratio > 1 + args.threshold:
+                verdict = "regression"
+                regressions += 1
+            elif ratio < 1 - args.threshold:
+                verdict = "improvement"
+            else:
+                verdict = "unchanged"
+            rows.append(
+                {
+                    "stage": case[0],
+                    "size": case[1],
+                    "metric": metric,
+                    "base": old,
+                    "new": cur,
+                    "ratio": round(ratio, 3),
+                    "verdict": verdict,
+                }
+            )
+
+    missing = sorted(base_cases.keys() - new_cases.keys())
+    print(
+        json.dumps(
+            {
+                "threshold": args.threshold,
+                "regressions": regressions,
+                "missing_cases": [list(case) for case in missing],
+                "comparisons": rows,
+            },
+            indent=2,
+        )
+    )
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    run_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="synthetic corpus sizes in chunks (up to 1000000)",
+    )
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--queries", type=int, default=200)
+    run_parser.add_argument("--dim", type=int, default=384)
+    run_parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    run_parser.add_argument("--batch-size", type=int, default=64)
+    run_parser.add_argument(
+        "--encode-limit",
+        type=int,
+        default=4096,
+        help="cap on texts embedded per size (CPU encoding of 1M chunks takes hours)",
+    )
+    run_parser.add_argument("--parse-repeats", type=int, default=200)
+    run_parser.add_argument("--out", default=None)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
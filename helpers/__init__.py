@@ -3,7 +3,16 @@ import textwrap
 import os
 import pickle
 
-from .llm_model import LlmModel
+from .clients import chat_completion, client_stats, get_client
+
+
+def __getattr__(name):
+    # LlmModel is imported on first use to keep `import helpers` cheap
+    if name == "LlmModel":
+        from .llm_model import LlmModel
+
+        return LlmModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def wrap_text(data):
@@ -0,0 +1,159 @@
+import json
+import os
+
+import numpy as np
+
+from .retrieval import normalize_rows, top_k_indices
+
+ANN_FORMAT_VERSION = 1
+
+
+def _assign(matrix, centroids, batch_size=65536):
+    # nearest centroid (by inner product) for every row, in batches
+    labels = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), batch_size):
+        block = np.asarray(matrix[start : start + batch_size], dtype=np.float32)
+        labels[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(matrix, n_lists, n_iter=10, sample_size=100_000, seed=0):
+    """
+    Cluster unit vectors into n_lists centroids (k-means on cosine similarity)
+    """
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    sample_rows = np.sort(rng.choice(n, size=min(n, sample_size), replace=False))
+    sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = counts == 0
+        # per-centroid sums via one sort + reduceat instead of np.add.at
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.zeros_like(centroids)
+        sums[~empty] = np.add.reduceat(
+            sample[np.argsort(labels, kind="stable")], starts[~empty], axis=0
+        )
+        if empty.any():
+            # re-seed empty lists with random sample points
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over a normalized float32 matrix.
+
+    Rows are bucketed by their nearest k-means centroid. A query scores the
+    centroids, then scores exactly only the rows in the n_probe closest
+    lists. The vectors themselves stay in the (memory-mapped) matrix; the
+    index stores centroids and the row ids of each list.
+    """
+
+    def __init__(self, matrix, centroids, order, offsets, n_probe=8):
+        self.matrix = matrix
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, n_probe=8, n_iter=10, sample_size=100_000, seed=0):
+        """
+        Build the index; n_lists defaults to about 4 * sqrt(count)
+        """
+        n = len(matrix)
+        if n == 0:
+            raise ValueError("Cannot build an ANN index over an empty matrix.")
+        n_lists = int(min(n, n_lists or max(1, round(4 * np.sqrt(n)))))
+        centroids = spherical_kmeans(matrix, n_lists, n_iter, sample_size, seed)
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return cls(matrix, centroids, order, offsets, n_probe=n_probe)
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def _candidates(self, query, n_probe):
+        lists = top_k_indices(self.centroids @ query, n_probe)
+        return np.concatenate(
+            [self.order[self.offsets[i] : self.offsets[i + 1]] for i in lists]
+        )
+
+    def search(self, query, k=3, n_probe=None):
+        """
+        Return (rows, scores) of the approximate top-k for one query
+        """
+        query = normalize_rows(query)
+        candidates = self._candidates(query, n_probe or self.n_probe)
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates.sort()  # sequential reads from the memory map
+        scores = np.asarray(self.matrix[candidates], dtype=np.float32) @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+    def save(self, path):
+        """
+        Save centroids, list layout and parameters to an .npz file
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        params = {
+            "format_version": ANN_FORMAT_VERSION,
+            "kind": "ivf",
+            "count": len(self),
+            "n_probe": self.n_probe,
+        }
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            order=self.order,
+            offsets=self.offsets,
+            params=np.array(json.dumps(params)),
+        )
+        os.replace(tmp_path, path)
+        print(f"\nSaved IVF index ({self.n_lists} lists) to {path}\n")
+
+    @classmethod
+    def load(cls, path, matrix):
+        """
+        Load an index saved with save() and attach it to the matrix it was built on
+        """
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            if params.get("format_version") != ANN_FORMAT_VERSION:
+                raise ValueError(f"Unsupported ANN index version in {path}")
+            if params["count"] != len(matrix):
+                raise ValueError(f"ANN index {path} does not match the vector store.")
+            return cls(
+                matrix,
+                data["centroids"],
+                data["order"],
+                data["offsets"],
+                n_probe=params["n_probe"],
+            )
+
+
+def attach_ann(index, path):
+    """
+    Attach the IVF index saved at path to a VectorIndex, if it exists and matches
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        index.ann = IVFIndex.load(path, index.matrix)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Ignoring ANN index {path}: {e}")
+        index.ann = None
+    return index.ann
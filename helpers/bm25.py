@@ -0,0 +1,173 @@
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from .retrieval import top_k_indices
+
+BM25_FORMAT_VERSION = 1
+
+# keeps identifiers such as "fsma", "204", "42%", "3.5" and "lot-2024-07" intact
+_token_pattern = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*%?")
+
+
+def tokenize(text):
+    """
+    Lowercase lexical tokens for BM25
+    """
+    return _token_pattern.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index stored as flat arrays.
+
+    postings for term t are doc_ids[indptr[t]:indptr[t + 1]] with matching
+    term frequencies in tfs. A query gathers the postings of its terms,
+    computes every contribution in one vectorized pass and sums them per
+    document with np.bincount.
+    """
+
+    def __init__(self, vocab, indptr, doc_ids, tfs, doc_lengths, k1=1.2, b=0.75):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(doc_lengths)
+        doc_freq = np.diff(indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        avgdl = float(doc_lengths.mean()) if n_docs else 1.0
+        # per-document part of the BM25 denominator, computed once
+        self._norm = (k1 * (1 - b + b * doc_lengths / max(avgdl, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts, k1=1.2, b=0.75):
+        """
+        Build the index from an iterable of document texts (row order is kept)
+        """
+        vocab = {}
+        term_ids, doc_ids, tfs, doc_lengths = [], [], [], []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(term_ids, minlength=len(vocab)))
+        return cls(
+            vocab,
+            indptr,
+            np.asarray(doc_ids, dtype=np.int32)[order],
+            np.asarray(tfs, dtype=np.float32)[order],
+            np.asarray(doc_lengths, dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def score(self, query_text):
+        """
+        BM25 score of every document for a query
+        """
+        term_ids = [self.vocab[t] for t in set(tokenize(query_text)) if t in self.vocab]
+        if not term_ids:
+            return np.zeros(len(self), dtype=np.float32)
+
+        slices = [np.arange(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        positions = np.concatenate(slices)
+        idf = np.repeat(self.idf[term_ids], [len(s) for s in slices])
+        docs = self.doc_ids[positions]
+        tf = self.tfs[positions]
+        contribution = idf * tf * (self.k1 + 1) / (tf + self._norm[docs])
+        return np.bincount(docs, weights=contribution, minlength=len(self)).astype(
+            np.float32
+        )
+
+    def search(self, query_text, k=10):
+        """
+        Return (rows, scores) of the top-k documents with a non-zero score
+        """
+        scores = self.score(query_text)
+        rows = top_k_indices(scores, k)
+        rows = rows[scores[rows] > 0]
+        return rows, scores[rows]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        params = {
+            "format_version": BM25_FORMAT_VERSION,
+            "count": len(self),
+            "k1": self.k1,
+            "b": self.b,
+        }
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.array(terms, dtype=str),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            tfs=self.tfs,
+            doc_lengths=self.doc_lengths,
+            params=np.array(json.dumps(params)),
+        )
+        os.replace(tmp_path, path)
+        print(f"\nSaved BM25 index ({len(terms)} terms) to {path}\n")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            if params.get("format_version") != BM25_FORMAT_VERSION:
+                raise ValueError(f"Unsupported BM25 index version in {path}")
+            vocab = {term: i for i, term in enumerate(data["terms"].tolist())}
+            return cls(
+                vocab,
+                data["indptr"],
+                data["doc_ids"],
+                data["tfs"],
+                data["doc_lengths"],
+                k1=params["k1"],
+                b=params["b"],
+            )
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse ranked row lists: score(row) = sum over lists of 1 / (k + rank)
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def attach_bm25(index, path):
+    """
+    Attach the BM25 index saved at path to a VectorIndex, if it exists and matches
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        lexical = BM25Index.load(path)
+        if len(lexical) != len(index):
+            raise ValueError("row count does not match the vector store")
+        index.lexical = lexical
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Ignoring BM25 index {path}: {e}")
+        index.lexical = None
+    return index.lexical
@@ -0,0 +1,132 @@
+import io
+import threading
+
+DEFAULT_ENCODING = "cl100k_base"
+DEFAULT_WINDOW_CHARS = 1 << 20
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(name=DEFAULT_ENCODING):
+    """
+    Return a cached tiktoken encoding
+    """
+    encoding = _encodings.get(name)
+    if encoding is None:
+        import tiktoken
+
+        with _encodings_lock:
+            encoding = _encodings.setdefault(name, tiktoken.get_encoding(name))
+    return encoding
+
+
+def count_tokens(text, encoding=None):
+    """
+    Number of tokens in a text
+    """
+    encoding = encoding or get_encoding()
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_at_whitespace(buffer):
+    # cut before the last whitespace run so a window never ends mid-word or
+    # mid-run (tiktoken splits a run differently when it is cut short)
+    cut = max(buffer.rfind(c) for c in " \n\t\r")
+    if cut <= 0:
+        return buffer, ""
+    cut = len(buffer[:cut].rstrip())
+    if cut <= 0:
+        return buffer, ""
+    return buffer[:cut], buffer[cut:]
+
+
+def iter_chunks_from_reader(
+    read, chunk_size=64, overlap=12, encoding=None, window_chars=DEFAULT_WINDOW_CHARS
+):
+    """
+    Yield token chunks from a text stream read window by window.
+
+    read(n) must return up to n characters ("" at the end). Each window is
+    tokenized once and cut at whitespace. The unfinished tail is carried into
+    the next window, so memory stays bounded by the window size however large
+    the source is. Each chunk is a dict with chunk_index, text, start_char and
+    end_char (character offsets into the whole stream) and token_count.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    encoding = encoding or get_encoding()
+    step = chunk_size - overlap
+
+    carry = ""
+    carry_offset = 0
+    chunk_index = 0
+    eof = False
+    while not eof:
+        block = read(window_chars)
+        eof = len(block) < window_chars
+        if eof:
+            segment, rest = carry + block, ""
+        else:
+            segment, rest = _split_at_whitespace(carry + block)
+
+        tokens = encoding.encode(segment, disallowed_special=())
+        _, offsets = encoding.decode_with_offsets(tokens)
+        n_tokens = len(tokens)
+
+        start = 0
+        while start < n_tokens:
+            end = start + chunk_size
+            # before EOF a chunk must end strictly inside the window: the
+            # window's last token may still merge with the text after it
+            if end >= n_tokens and not eof:
+                break
+            start_char = offsets[start]
+            end_char = offsets[end] if end < n_tokens else len(segment)
+            text = segment[start_char:end_char]
+            if text.strip():
+                yield {
+                    "chunk_index": chunk_index,
+                    "text": text,
+                    "start_char": carry_offset + start_char,
+                    "end_char": carry_offset + end_char,
+                    "token_count": min(end, n_tokens) - start,
+                }
+                chunk_index += 1
+            if end >= n_tokens:
+                start = n_tokens
+                break
+            start += step
+
+        # keep everything from the first unfinished chunk for the next window
+        keep_from = offsets[start] if start < n_tokens else len(segment)
+        carry = segment[keep_from:] + rest
+        carry_offset += keep_from
+
+
+def iter_token_chunks(text, chunk_size=64, overlap=12, encoding=None):
+    """
+    Yield token chunks (with character offsets) from an in-memory text
+    """
+    window_chars = max(len(text) + 1, 1)
+    return iter_chunks_from_reader(
+        io.StringIO(text).read, chunk_size, overlap, encoding, window_chars
+    )
+
+
+def iter_file_chunks(
+    path,
+    chunk_size=64,
+    overlap=12,
+    encoding=None,
+    window_chars=DEFAULT_WINDOW_CHARS,
+):
+    """
+    Yield token chunks from a UTF-8 text file without loading it whole.
+
+    Newlines are read untranslated, so offsets index the file's characters.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from iter_chunks_from_reader(
+            f.read, chunk_size, overlap, encoding, window_chars
+        )
@@ -0,0 +1,293 @@
+import inspect
+import os
+import random
+import threading
+import time
+
+from .llm_cache import CachedResponse, cache_enabled, get_default_cache, make_cache_key
+from .rate_limit import DEFAULT_COMPLETION_TOKENS, get_limiter, provider_of, rate_limit_stats
+from .usage import record_call, track_stream, usage_of
+
+API_KEY_ENV = {
+    "together": "TOGETHER_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+_stats = {
+    "clients_created": 0,
+    "client_cache_hits": 0,
+    "requests": 0,
+    "retries": 0,
+    "throttled": 0,
+    "failures": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _http_client(pool_size, timeout):
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=pool_size, max_keepalive_connections=pool_size
+    )
+    return httpx.Client(limits=limits, timeout=timeout)
+
+
+def _build_client(provider, api_key, timeout, pool_size):
+    # retries are handled by chat_completion, so SDK retries are turned off
+    if provider == "together":
+        import together
+
+        kwargs = {"api_key": api_key, "timeout": timeout, "max_retries": 0}
+        # together>=2 is httpx based and accepts a pooled client
+        if "http_client" in inspect.signature(together.Together).parameters:
+            kwargs["http_client"] = _http_client(pool_size, timeout)
+        return together.Together(**kwargs)
+    elif provider == "openai":
+        import openai
+
+        return openai.OpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=_http_client(pool_size, timeout),
+        )
+    elif provider == "openrouter":
+        import openrouter
+
+        return openrouter.OpenRouter(api_key=api_key)
+    raise ValueError(f"Unknown provider: {provider}")
+
+
+def get_client(provider="together", api_key=None, timeout=60.0, pool_size=10):
+    """
+    Return the shared client for (provider, api key), creating it on first use.
+
+    Reusing one client keeps its HTTP connections alive across calls instead
+    of paying connection and TLS setup for every request.
+    """
+    api_key = api_key or os.getenv(API_KEY_ENV.get(provider, ""))
+    key = (provider, api_key)
+    client = _clients.get(key)
+    if client is not None:
+        _count("client_cache_hits")
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(provider, api_key, timeout, pool_size)
+            _clients[key] = client
+            _count("clients_created")
+        else:
+            _count("client_cache_hits")
+    return client
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    """
+    True for rate limits (429), server errors (5xx), timeouts and dropped connections
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name or "RateLimit" in name
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_throttle(error):
+    return _status_code(error) == 429 or "RateLimit" in type(error).__name__
+
+
+def _estimated_tokens(kwargs):
+    # a 4-characters-per-token guess; the reservation is corrected from the
+    # reported usage once the call returns
+    chars = sum(len(str(m.get("content") or "")) for m in kwargs.get("messages") or [])
+    return chars // 4 + 1 + (kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def _release_after(stream, limiter, ticket, reserved):
+    used = 0
+    try:
+        for chunk in stream:
+            reported = usage_of(chunk)
+            if reported:
+                used = sum(reported)
+            yield chunk
+    finally:
+        limiter.release(ticket, unused_tokens=reserved - used if used else 0)
+
+
+def _cache_stream(stream, cache, key):
+    pieces = []
+    for chunk in stream:
+        choices = getattr(chunk, "choices", None)
+        text = getattr(choices[0].delta, "content", None) if choices else None
+        if text:
+            pieces.append(text)
+        yield chunk
+    # only a fully consumed stream is cached
+    cache.set(key, "".join(pieces))
+
+
+def _cache_lookup(client, cache, use_cache, usage, kwargs):
+    # returns (cache, key or None, cached response or None)
+    if cache is None:
+        cache = get_default_cache() if cache_enabled() else None
+    if not cache:
+        return None, None, None
+    if not use_cache:
+        cache.record_bypass()
+        return cache, None, None
+    start = time.perf_counter()
+    model, messages = kwargs.get("model"), kwargs.get("messages")
+    params = {k: v for k, v in kwargs.items() if k not in ("model", "messages", "stream")}
+    key = make_cache_key(provider_of(client), model, messages, params)
+    output = cache.get(key)
+    if output is None:
+        return cache, key, None
+    latency = time.perf_counter() - start
+    stream = bool(kwargs.get("stream"))
+    record_call(
+        model,
+        messages,
+        output,
+        latency,
+        ttft_s=latency,
+        cached=True,
+        stream=stream,
+        totals=usage,
+    )
+    response = CachedResponse(output)
+    return cache, key, iter([response]) if stream else response
+
+
+def chat_completion(
+    client,
+    max_retries=3,
+    backoff=0.5,
+    max_backoff=20.0,
+    usage=None,
+    rate_limit=True,
+    max_throttle_retries=8,
+    cache=None,
+    use_cache=True,
+    **kwargs,
+):
+    """
+    client.chat.completions.create with rate limiting and retry on 429/5xx.
+
+    Every attempt first takes a slot from the provider's shared
+    helpers.rate_limit limiter (requests/min, tokens/min and an adaptive
+    concurrency limit that backs off on 429s). Throttled attempts get their
+    own retry budget (max_throttle_retries) so a burst of 429s does not drop
+    the call. Waits follow exponential backoff with full jitter, or the
+    server's Retry-After header when it sends one. Token usage, latency
+    (retries and queueing included) and cost are recorded with helpers.usage;
+    usage is an optional extra UsageTotals to add the call to. Streams are
+    recorded once consumed.
+
+    Responses are cached by provider, model, messages and the other request
+    parameters: cache is an LlmCache, False for none, or None to use the
+    shared on-disk cache when LLM_CACHE=1. use_cache=False skips the cache
+    for this call. A hit returns a CachedResponse (a one-chunk stream when
+    stream=True) without calling the provider.
+    """
+    cache, key, cached = _cache_lookup(client, cache, use_cache, usage, kwargs)
+    if cached is not None:
+        return cached
+
+    limiter = get_limiter(provider_of(client)) if rate_limit else None
+    reserved = _estimated_tokens(kwargs) if limiter else 0
+    attempt, throttles = 0, 0
+    start = time.perf_counter()
+    while True:
+        _count("requests")
+        if limiter:
+            ticket = limiter.acquire(reserved)
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            throttled = _is_throttle(e)
+            if limiter:
+                # a rejected request used none of its reserved tokens
+                limiter.release(ticket, throttled=throttled, unused_tokens=reserved)
+            if throttled and throttles < max_throttle_retries:
+                throttles += 1
+                _count("throttled")
+            elif attempt >= max_retries or not is_retryable(e):
+                _count("failures")
+                raise
+            else:
+                attempt += 1
+            delay = _retry_after(e)
+            if delay is None:
+                retry = attempt + throttles - 1
+                delay = random.uniform(0, min(max_backoff, backoff * 2**retry))
+            _count("retries")
+            time.sleep(delay)
+            continue
+
+        model, messages = kwargs.get("model"), kwargs.get("messages")
+        if kwargs.get("stream"):
+            if limiter:
+                # the slot is held until the stream is consumed
+                response = _release_after(response, limiter, ticket, reserved)
+            if key is not None:
+                response = _cache_stream(response, cache, key)
+            return track_stream(response, model, messages, start, totals=usage)
+        latency = time.perf_counter() - start
+        reported = usage_of(response)
+        if limiter:
+            limiter.release(ticket, unused_tokens=reserved - sum(reported) if reported else 0)
+        choices = getattr(response, "choices", None)
+        output = choices[0].message.content if choices else None
+        if key is not None and output is not None:
+            cache.set(key, output)
+        record_call(
+            model,
+            messages,
+            output,
+            latency,
+            ttft_s=latency,
+            reported=reported,
+            totals=usage,
+        )
+        return response
+
+
+def client_stats():
+    """
+    Clients created and get_client cache hits (not HTTP connection reuse, which
+    the pooled httpx client handles), request, retry, throttle and failure
+    totals, and the rate limiter metrics by provider
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pooled_clients"] = len(_clients)
+    stats["rate_limits"] = rate_limit_stats()
+    return stats
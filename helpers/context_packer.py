@@ -0,0 +1,161 @@
+import re
+
+from .chunker import count_tokens, get_encoding
+from .rag import format_context
+
+DEFAULT_TOKEN_BUDGET = 1024
+
+_word_pattern = re.compile(r"\w+")
+
+
+def _source_key(chunk):
+    return chunk.get("doc_id") or chunk.get("source_file")
+
+
+def _words(chunk):
+    return set(_word_pattern.findall(chunk["text"].lower()))
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_adjacent(chunks):
+    """
+    Merge chunks from the same source whose character ranges overlap or touch.
+
+    Chunk texts are slices of their source (start_char:end_char), so the
+    overlap is cut from the later chunk instead of being sent twice. A merged
+    chunk keeps the best score and joins the chunk ids with "+".
+    """
+    groups, passthrough = {}, []
+    for chunk in chunks:
+        key = _source_key(chunk)
+        if key is None or chunk.get("start_char") is None or chunk.get("end_char") is None:
+            passthrough.append(chunk)
+        else:
+            groups.setdefault(key, []).append(chunk)
+
+    merged = []
+    for group in groups.values():
+        group.sort(key=lambda c: c["start_char"])
+        current = dict(group[0])
+        for chunk in group[1:]:
+            if chunk["start_char"] <= current["end_char"]:
+                overlap = current["end_char"] - chunk["start_char"]
+                if chunk["end_char"] > current["end_char"]:
+                    current["text"] += chunk["text"][overlap:]
+                    current["end_char"] = chunk["end_char"]
+                current["chunk_id"] = f"{current['chunk_id']}+{chunk['chunk_id']}"
+                current["score"] = max(current.get("score", 0.0), chunk.get("score", 0.0))
+            else:
+                merged.append(current)
+                current = dict(chunk)
+        merged.append(current)
+    return merged + passthrough
+
+
+def remove_near_duplicates(chunks, threshold=0.8):
+    """
+    Drop chunks whose word-set Jaccard similarity to a better-scored chunk is >= threshold
+    """
+    kept, kept_words = [], []
+    for chunk in sorted(chunks, key=lambda c: c.get("score", 0.0), reverse=True):
+        words = _words(chunk)
+        if any(_jaccard(words, other) >= threshold for other in kept_words):
+            continue
+        kept.append(chunk)
+        kept_words.append(words)
+    return kept
+
+
+def _mmr_order(chunks, mmr_lambda):
+    # maximal marginal relevance: trade retrieval score against redundancy
+    remaining = list(chunks)
+    words = {id(c): _words(c) for c in chunks}
+    ordered = []
+    while remaining:
+        def mmr(chunk):
+            redundancy = max(
+                (_jaccard(words[id(chunk)], words[id(o)]) for o in ordered), default=0.0
+            )
+            return mmr_lambda * chunk.get("score", 0.0) - (1 - mmr_lambda) * redundancy
+
+        best = max(remaining, key=mmr)
+        ordered.append(best)
+        remaining.remove(best)
+    return ordered
+
+
+def _truncate(chunk, token_budget, encoding):
+    overhead = count_tokens(format_context([dict(chunk, text="")]), encoding)
+    allowed = token_budget - overhead
+    if allowed <= 0:
+        return None
+    tokens = encoding.encode(chunk["text"], disallowed_special=())[:allowed]
+    truncated = dict(chunk, text=encoding.decode(tokens), truncated=True)
+    if chunk.get("start_char") is not None:
+        truncated["end_char"] = chunk["start_char"] + len(truncated["text"])
+    return truncated
+
+
+def pack_context(
+    entries,
+    token_budget=DEFAULT_TOKEN_BUDGET,
+    strategy="score",
+    mmr_lambda=0.7,
+    dedupe_threshold=0.8,
+    encoding=None,
+):
+    """
+    Pack retrieved chunks into a prompt context that fits a token budget.
+
+    entries are {"score", "chunk"} dicts (the Task 9 / search_chunks shape).
+    Adjacent or overlapping chunks of the same source are merged, near
+    duplicates removed, then chunks are added greedily by score (or by MMR
+    with strategy="mmr") while their prompt lines fit the budget. If not even
+    the best chunk fits, it is truncated to the budget. Returns
+    (chunks, stats); the chunks are ready for helpers.rag.format_context.
+    """
+    if strategy not in ("score", "mmr"):
+        raise ValueError(f"Unknown packing strategy: {strategy}")
+    encoding = encoding or get_encoding()
+
+    chunks = [dict(entry["chunk"], score=entry.get("score", 0.0)) for entry in entries]
+    input_tokens = count_tokens(format_context(chunks), encoding)
+
+    merged = merge_adjacent(chunks)
+    unique = remove_near_duplicates(merged, dedupe_threshold)
+    if strategy == "mmr":
+        ordered = _mmr_order(unique, mmr_lambda)
+    else:
+        ordered = sorted(unique, key=lambda c: c.get("score", 0.0), reverse=True)
+
+    packed, used = [], 0
+    for chunk in ordered:
+        tokens = count_tokens(format_context([chunk]), encoding)
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            # never send an empty context: cut the best chunk down to the budget
+            chunk = _truncate(chunk, token_budget, encoding)
+            if chunk is None:
+                continue
+            tokens = count_tokens(format_context([chunk]), encoding)
+        packed.append(chunk)
+        used += tokens
+
+    stats = {
+        "strategy": strategy,
+        "token_budget": token_budget,
+        "input_chunks": len(chunks),
+        "input_tokens": input_tokens,
+        "merged_chunks": len(chunks) - len(merged),
+        "duplicates_removed": len(merged) - len(unique),
+        "dropped_over_budget": len(unique) - len(packed),
+        "packed_chunks": len(packed),
+        "packed_tokens": used,
+    }
+    return packed, stats
@@ -0,0 +1,250 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .chunker import iter_token_chunks
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _document(doc_id, text, metadata):
+    return {"doc_id": doc_id, "text": text.strip(), "metadata": metadata}
+
+
+def parse_markdown(path, metadata):
+    """
+    Split a markdown report into one document per "## " section
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    title = metadata.get("file_title")
+    sections, heading, lines = [], None, []
+    for line in text.splitlines():
+        if line.startswith("# "):
+            title = title or line[2:].strip()
+        elif line.startswith("## "):
+            sections.append((heading, lines))
+            heading, lines = line[3:].strip(), []
+        else:
+            lines.append(line)
+    sections.append((heading, lines))
+
+    base = os.path.splitext(os.path.basename(path))[0]
+    documents = []
+    for index, (section, body) in enumerate(sections):
+        body = "\n".join(body).strip()
+        if not body:
+            continue
+        section_text = f"{section}\n\n{body}" if section else body
+        documents.append(
+            _document(
+                f"{base}_s{index}",
+                section_text,
+                dict(metadata, file_title=title, section=section),
+            )
+        )
+    return documents
+
+
+def parse_file_dict(file_dict, metadata):
+    """
+    Build documents from a file_dict.json section tree (introduction, subsections, conclusion)
+    """
+    base = file_dict.get("file_name", "document")
+    parts = [("Introduction", file_dict.get("introduction"))]
+    for sub in file_dict.get("subsections", []):
+        parts.append((sub.get("heading"), sub.get("content")))
+    parts.append(("Conclusion", file_dict.get("conclusion")))
+
+    documents = []
+    for index, (heading, content) in enumerate(parts):
+        if not content:
+            continue
+        documents.append(
+            _document(
+                f"{base}_s{index}",
+                f"{heading}\n\n{content}" if heading else content,
+                dict(metadata, section=heading),
+            )
+        )
+    return documents
+
+
+def parse_mailbox(path, metadata):
+    """
+    Turn a Roundcube .jsonl export into one document per email
+    """
+    base = os.path.splitext(os.path.basename(path))[0]
+    documents = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("type") != "email":
+                continue
+
+            header = [
+                f"Subject: {record.get('subject', '')}",
+                f"From: {record.get('from_name', '')} <{record.get('from', '')}>",
+                f"To: {', '.join(record.get('to', []))}",
+                f"Date: {record.get('date', '')}",
+            ]
+            text = "\n".join(header) + "\n\n" + record.get("body", "")
+            documents.append(
+                _document(
+                    f"{base}_{record.get('id', 'email')}_l{line_number}",
+                    text,
+                    dict(
+                        metadata,
+                        email_id=record.get("id"),
+                        subject=record.get("subject"),
+                        date=record.get("date"),
+                    ),
+                )
+            )
+    return documents
+
+
+def parse_pdf(path, metadata):
+    """
+    Extract text from a PDF with pypdf (optional dependency), one document per page
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        print(f"Skipping {path}: install pypdf to read PDFs without a markdown copy.")
+        return []
+
+    base = os.path.splitext(os.path.basename(path))[0]
+    documents = []
+    for page_number, page in enumerate(PdfReader(path).pages, 1):
+        text = page.extract_text() or ""
+        if text.strip():
+            documents.append(
+                _document(f"{base}_p{page_number}", text, dict(metadata, page=page_number))
+            )
+    return documents
+
+
+def load_file_folder(folder):
+    """
+    Parse one DRBench file folder (e.g. files/DI001_pdf) into normalized documents.
+
+    Metadata comes from qa_dict.json (insight_id, qa_type) and file_dict.json
+    (file_title, app, file_format). Markdown copies are preferred over PDFs,
+    and .jsonl mailboxes over their .txt exports.
+    """
+    qa = _read_json(os.path.join(folder, "qa_dict.json"))
+    file_dict = _read_json(os.path.join(folder, "file_dict.json"))
+    names = sorted(os.listdir(folder))
+
+    def metadata_for(name, file_format):
+        return {
+            "insight_id": qa.get("insight_id", os.path.basename(folder)),
+            "qa_type": qa.get("qa_type"),
+            "app": file_dict.get("app"),
+            "file_title": file_dict.get("file_title"),
+            "file_format": file_format,
+            "source_file": name,
+            "source_path": os.path.join(folder, name),
+        }
+
+    documents = []
+    mailboxes = [n for n in names if n.endswith(".jsonl")]
+    markdown = [n for n in names if n.endswith(".md")]
+    for name in mailboxes:
+        documents += parse_mailbox(os.path.join(folder, name), metadata_for(name, "email"))
+    for name in markdown:
+        documents += parse_markdown(os.path.join(folder, name), metadata_for(name, "md"))
+
+    if not documents and file_dict.get("subsections"):
+        name = f"{file_dict.get('file_name', 'document')}.{file_dict.get('file_format', 'pdf')}"
+        documents += parse_file_dict(file_dict, metadata_for(name, "file_dict"))
+    if not documents:
+        for name in (n for n in names if n.endswith(".pdf")):
+            documents += parse_pdf(os.path.join(folder, name), metadata_for(name, "pdf"))
+
+    # prefix ids with the folder name so they stay unique across the task
+    prefix = os.path.basename(folder)
+    for document in documents:
+        document["doc_id"] = f"{prefix}/{document['doc_id']}"
+    return documents
+
+
+def find_file_folders(task_dir):
+    """
+    List the file folders of a DR task (task_dir/files/*)
+    """
+    files_dir = os.path.join(task_dir, "files")
+    if not os.path.isdir(files_dir):
+        raise FileNotFoundError(f"{files_dir} not found.")
+    return [
+        os.path.join(files_dir, name)
+        for name in sorted(os.listdir(files_dir))
+        if os.path.isdir(os.path.join(files_dir, name))
+    ]
+
+
+def iter_documents(task_dir, max_workers=None, max_pending=None):
+    """
+    Yield the documents of a DR task folder, parsing file folders in a process pool.
+
+    At most max_pending folders (default 2 per worker) are parsed ahead of the
+    consumer, so memory stays bounded however large the folder is. Documents
+    are yielded in folder order, so chunk rows and the files written from
+    them are the same on every run.
+    """
+    folders = find_file_folders(task_dir)
+    max_workers = max_workers or min(len(folders), os.cpu_count() or 1) or 1
+    max_pending = max_pending or max_workers * 2
+
+    if max_workers == 1:
+        for folder in folders:
+            yield from load_file_folder(folder)
+        return
+
+    remaining = iter(folders)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for folder in remaining:
+            pending.append(executor.submit(load_file_folder, folder))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            # wait for the oldest folder while the later ones keep parsing
+            documents = pending.popleft().result()
+            folder = next(remaining, None)
+            if folder is not None:
+                pending.append(executor.submit(load_file_folder, folder))
+            yield from documents
+
+
+def iter_document_chunks(documents, chunk_size=64, overlap=12, encoding=None):
+    """
+    Stream documents through the token chunker as chunk records with their metadata
+    """
+    for document in documents:
+        for chunk in iter_token_chunks(document["text"], chunk_size, overlap, encoding):
+            yield dict(
+                document["metadata"],
+                chunk_id=f"{document['doc_id']}_{chunk['chunk_index']}",
+                doc_id=document["doc_id"],
+                chunk_index=chunk["chunk_index"],
+                start_char=chunk["start_char"],
+                end_char=chunk["end_char"],
+                token_count=chunk["token_count"],
+                text=chunk["text"],
+            )
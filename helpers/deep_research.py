@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import time
+
+from .embedding_models import DEFAULT_MODEL, get_embedding_model
+from .rag import build_insight_prompt, build_synthesis_prompt, parse_insights
+
+
+def load_dr_question(task_dir):
+    """
+    Return (dr_question, subquestions) from a DRBench task folder's dr_question.json
+    """
+    with open(os.path.join(task_dir, "dr_question.json"), "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    subquestions = payload.get("subquestions") or payload.get(
+        "question_source", {}
+    ).get("subquestions", [])
+    return payload["dr_question"], list(subquestions)
+
+
+def retrieve_all(questions, chunk_records, index, model, k=3):
+    """
+    Retrieve for every question with one encode call and one scoring pass.
+
+    Returns one list of flat chunk dicts (with their score) per question.
+    """
+    embeddings = model.encode(
+        list(questions), batch_size=len(questions), convert_to_numpy=True
+    )
+    results = index.search_batch(embeddings, k=k)
+    return [
+        [dict(chunk_records[row], score=score) for row, score in nearest]
+        for nearest, _ in results
+    ]
+
+
+async def _answer_hops(llm, subquestions, retrieved, t0):
+    async def hop(subquestion, chunks):
+        start = time.perf_counter()
+        error = None
+        try:
+            output = await llm.aprompt_llm(build_insight_prompt(subquestion, chunks))
+            insights = parse_insights(output)
+        except Exception as e:
+            insights, error = [], f"{type(e).__name__}: {e}"
+        end = time.perf_counter()
+        return {
+            "subquestion": subquestion,
+            "chunk_ids": [chunk["chunk_id"] for chunk in chunks],
+            "insights": insights,
+            "error": error,
+            "start_s": round(start - t0, 4),
+            "end_s": round(end - t0, 4),
+            "generation_s": round(end - start, 4),
+        }
+
+    return await asyncio.gather(
+        *(hop(subquestion, chunks) for subquestion, chunks in zip(subquestions, retrieved))
+    )
+
+
+def deep_research(question, subquestions, chunk_records, index, llm, model=None, k=3):
+    """
+    Answer a multi-hop research question through its subquestions.
+
+    1. retrieve for every subquestion in one batched encode/scoring pass
+    2. answer the subquestions concurrently (llm.aprompt_llm, bounded by the
+       model's max_concurrency)
+    3. merge their cited insights in a single synthesis call
+
+    Returns a report with the final insights, every hop's retrieval and
+    insights, per-hop latency and the critical path (retrieval + slowest hop
+    + synthesis) next to the time the same calls would take one after another.
+    """
+    if len(chunk_records) != len(index):
+        raise ValueError("Mismatch between chunk metadata and embeddings.")
+    if not subquestions:
+        subquestions = [question]
+    model = model or get_embedding_model(DEFAULT_MODEL)
+
+    t0 = time.perf_counter()
+    retrieved = retrieve_all(subquestions, chunk_records, index, model, k=k)
+    retrieval_s = time.perf_counter() - t0
+
+    hops = asyncio.run(_answer_hops(llm, subquestions, retrieved, t0))
+    generation_end = time.perf_counter()
+
+    answered = [hop for hop in hops if hop["insights"]]
+    output = llm.prompt_llm(build_synthesis_prompt(question, answered or hops))
+    insights = parse_insights(output)
+    end = time.perf_counter()
+
+    synthesis_s = end - generation_end
+    slowest = max(hops, key=lambda hop: hop["generation_s"])
+    sequential_s = retrieval_s + sum(hop["generation_s"] for hop in hops) + synthesis_s
+    total_s = end - t0
+    return {
+        "dr_question": question,
+        "insights": insights,
+        "hops": hops,
+        "timing": {
+            "retrieval_s": round(retrieval_s, 4),
+            "generation_wall_s": round(generation_end - t0 - retrieval_s, 4),
+            "synthesis_s": round(synthesis_s, 4),
+            "total_s": round(total_s, 4),
+            "critical_path": ["retrieval", slowest["subquestion"], "synthesis"],
+            "critical_path_s": round(
+                retrieval_s + slowest["generation_s"] + synthesis_s, 4
+            ),
+            "sequential_s": round(sequential_s, 4),
+            "speedup": round(sequential_s / total_s, 2) if total_s else None,
+        },
+    }
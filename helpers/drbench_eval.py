@@ -0,0 +1,311 @@
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from .corpus import iter_document_chunks, iter_documents
+from .deep_research import deep_research, load_dr_question
+from .embedding_models import DEFAULT_MODEL, get_embedding_model
+from .rate_limit import rate_limit_stats
+from .recall_judge import evaluate_recall
+from .retrieval import VectorIndex
+from .usage import usage_scope
+
+DEFAULT_OUTPUT_DIR = "outputs/eval"
+GENERATION_MODEL = "deepseek-ai/DeepSeek-V3.1"
+
+
+def find_task_dirs(root):
+    """
+    DRBench task folders (DR*) under root, or root itself if it is one
+    """
+    if os.path.isfile(os.path.join(root, "dr_question.json")):
+        return [root]
+    return sorted(
+        path
+        for path in glob.glob(os.path.join(root, "DR*"))
+        if os.path.isfile(os.path.join(path, "dr_question.json"))
+    )
+
+
+def load_eval_items(task_dir):
+    """
+    Answers a report should contain ("insight") or leave out ("distractor").
+
+    Uses config/eval.json's dr_report_evaluation_qa, or the files/*/qa_dict.json
+    entries when a task has no eval config.
+    """
+    path = os.path.join(task_dir, "config", "eval.json")
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f).get("dr_report_evaluation_qa", [])
+    else:
+        items = []
+        pattern = os.path.join(task_dir, "files", "*", "qa_dict.json")
+        for qa_path in sorted(glob.glob(pattern)):
+            with open(qa_path, "r", encoding="utf-8") as f:
+                qa = json.load(f)
+            items.append(dict(qa, id=qa.get("insight_id")))
+    return [item for item in items if item.get("answer")]
+
+
+def build_task_index(task_dir, model, chunk_size=64, overlap=12):
+    """
+    Chunk and embed one task folder in memory (the Task 8 store is left untouched)
+    """
+    chunk_records = list(
+        iter_document_chunks(iter_documents(task_dir, max_workers=1), chunk_size, overlap)
+    )
+    if not chunk_records:
+        raise ValueError(f"No content found in {task_dir}.")
+    embeddings = model.encode(
+        [chunk["text"] for chunk in chunk_records],
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return chunk_records, VectorIndex(embeddings, normalized=True)
+
+
+def load_checkpoint(path):
+    """
+    Finished task results by task id from a checkpoint JSONL file
+    """
+    done = {}
+    if not os.path.isfile(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # a line cut short by an interrupted run
+                continue
+            if result.get("status") == "ok":
+                done[result["task_id"]] = result
+    return done
+
+
+class EvalRunner:
+    """
+    Score the research pipeline over many DRBench task folders.
+
+    Each task is ingested in memory, answered with helpers.deep_research and
+    judged for insight recall and distractor avoidance with
+    helpers.recall_judge. Tasks run in a pool of `workers` threads and judge
+    calls share a separate pool of `judge_workers`, so at most that many
+    judge requests are in flight. Every finished task is appended to a
+    checkpoint file, and a rerun skips the tasks already there.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        model=None,
+        output_dir=DEFAULT_OUTPUT_DIR,
+        workers=2,
+        judge_workers=4,
+        judge="prescore",
+        k=3,
+    ):
+        if llm is None:
+            from .llm_model import LlmModel
+
+            llm = LlmModel(model=GENERATION_MODEL)
+        self.llm = llm
+        self.model = model
+        self.output_dir = output_dir
+        self.workers = workers
+        self.judge_workers = judge_workers
+        self.judge = judge
+        self.k = k
+        self.checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+        self.report_path = os.path.join(output_dir, "report.json")
+        self._checkpoint_lock = threading.Lock()
+
+    def _judge(self, executor, query_text, answers, insights):
+        if not answers:
+            return None
+        # carry the task's usage scope into the judge thread
+        context = contextvars.copy_context()
+        return executor.submit(
+            context.run,
+            evaluate_recall,
+            query_text,
+            answers,
+            insights,
+            self.llm.prompt_llm,
+            mode=self.judge,
+            model=self.model,
+        )
+
+    def evaluate_task(self, task_dir, judge_executor):
+        """
+        Retrieve, generate and judge one task folder; returns its result dict
+        """
+        task_id = os.path.basename(os.path.normpath(task_dir))
+        start = time.perf_counter()
+        with usage_scope(f"eval {task_id}") as usage:
+            question, subquestions = load_dr_question(task_dir)
+            items = load_eval_items(task_dir)
+            chunk_records, index = build_task_index(task_dir, self.model)
+            ingest_s = time.perf_counter() - start
+
+            report = deep_research(
+                question,
+                subquestions,
+                chunk_records,
+                index,
+                self.llm,
+                model=self.model,
+                k=self.k,
+            )
+            insights = [item.get("insight", "") for item in report["insights"]]
+
+            judge_start = time.perf_counter()
+            answers = {"insight": [], "distractor": []}
+            for item in items:
+                answers.get(item.get("qa_type"), []).append(item["answer"])
+            recall = self._judge(judge_executor, question, answers["insight"], insights)
+            leaked = self._judge(judge_executor, question, answers["distractor"], insights)
+            recall = recall.result() if recall else None
+            leaked = leaked.result() if leaked else None
+            judge_s = time.perf_counter() - judge_start
+
+        retrieved_ids = [chunk_id for hop in report["hops"] for chunk_id in hop["chunk_ids"]]
+        qa_type_of = {chunk["chunk_id"]: chunk.get("qa_type") for chunk in chunk_records}
+        distractor_chunks = sum(qa_type_of.get(c) == "distractor" for c in retrieved_ids)
+        return {
+            "task_id": task_id,
+            "status": "ok",
+            "dr_question": question,
+            "insight_recall": recall["overall_recall"] if recall else None,
+            # share of distractor answers kept out of the report
+            "distractor_avoidance": 1 - leaked["overall_recall"] if leaked else None,
+            "retrieved_distractor_chunk_rate": (
+                distractor_chunks / len(retrieved_ids) if retrieved_ids else None
+            ),
+            "insights": report["insights"],
+            "judge_calls": sum(r["judge_calls"] for r in (recall, leaked) if r),
+            "latency_s": {
+                "ingest": round(ingest_s, 3),
+                "research": report["timing"]["total_s"],
+                "judge": round(judge_s, 3),
+                "total": round(time.perf_counter() - start, 3),
+            },
+            "research_timing": report["timing"],
+            "usage": usage.snapshot(),
+            "chunks": len(chunk_records),
+        }
+
+    def _checkpoint(self, result):
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+    def run(self, root, resume=True):
+        """
+        Evaluate every task folder under root and write the aggregate report
+        """
+        task_dirs = find_task_dirs(root)
+        if not task_dirs:
+            raise FileNotFoundError(f"No DR* task folders with dr_question.json in {root}.")
+        os.makedirs(self.output_dir, exist_ok=True)
+        if not resume and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        if self.model is None:
+            self.model = get_embedding_model(DEFAULT_MODEL)
+
+        done = load_checkpoint(self.checkpoint_path)
+        todo = [d for d in task_dirs if os.path.basename(os.path.normpath(d)) not in done]
+        print(f"Evaluating {len(todo)} task(s), {len(done)} already checkpointed")
+
+        results = dict(done)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.judge_workers) as judge_executor:
+            with ThreadPoolExecutor(self.workers) as executor:
+                futures = {
+                    executor.submit(self.evaluate_task, d, judge_executor): d for d in todo
+                }
+                for future in as_completed(futures):
+                    task_id = os.path.basename(os.path.normpath(futures[future]))
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {
+                            "task_id": task_id,
+                            "status": "failed",
+                            "error": f"{type(e).__name__}: {e}",
+                        }
+                    self._checkpoint(result)
+                    results[task_id] = result
+                    print(
+                        f"{task_id}: {result['status']} "
+                        f"recall={result.get('insight_recall')} "
+                        f"avoidance={result.get('distractor_avoidance')}"
+                    )
+
+        report = aggregate([results[k] for k in sorted(results)])
+        report["wall_s"] = round(time.perf_counter() - start, 3)
+        report["rate_limits"] = rate_limit_stats()
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved evaluation report to {self.report_path}")
+        return report
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def aggregate(results):
+    """
+    Mean scores, latency percentiles and token/cost totals over task results
+    """
+    ok = [r for r in results if r["status"] == "ok"]
+    latencies = np.asarray([r["latency_s"]["total"] for r in ok], dtype=np.float64)
+    usage = {
+        key: sum(r["usage"][key] for r in ok)
+        for key in ("calls", "prompt_tokens", "completion_tokens", "cost_usd")
+    }
+    usage["cost_usd"] = round(usage["cost_usd"], 6)
+    return {
+        "tasks": len(results),
+        "succeeded": len(ok),
+        "failed": [r["task_id"] for r in results if r["status"] != "ok"],
+        "insight_recall": _mean(r["insight_recall"] for r in ok),
+        "distractor_avoidance": _mean(r["distractor_avoidance"] for r in ok),
+        "retrieved_distractor_chunk_rate": _mean(
+            r["retrieved_distractor_chunk_rate"] for r in ok
+        ),
+        "judge_calls": sum(r["judge_calls"] for r in ok),
+        "latency_s": {
+            "p50": round(float(np.percentile(latencies, 50)), 3) if len(ok) else None,
+            "max": round(float(latencies.max()), 3) if len(ok) else None,
+            "sum": round(float(latencies.sum()), 3),
+        },
+        "usage": usage,
+        "per_task": [
+            {
+                key: r.get(key)
+                for key in (
+                    "task_id",
+                    "status",
+                    "error",
+                    "insight_recall",
+                    "distractor_avoidance",
+                    "retrieved_distractor_chunk_rate",
+                    "judge_calls",
+                    "latency_s",
+                    "usage",
+                )
+                if key in r
+            }
+            for r in results
+        ],
+    }
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+_models = {}
+_stats = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _rss_bytes():
+    """
+    Current resident set size of this process in bytes (0 if unknown)
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _parameter_bytes(model):
+    try:
+        return int(sum(p.numel() * p.element_size() for p in model.parameters()))
+    except Exception:
+        return None
+
+
+def get_embedding_model(name=DEFAULT_MODEL):
+    """
+    Return the process-wide SentenceTransformer for a model name, loading it once.
+
+    Safe to call from many threads: concurrent first calls for the same name
+    wait for a single load instead of each loading their own copy.
+    """
+    model = _models.get(name)
+    if model is not None:
+        _stats[name]["reuses"] += 1
+        return model
+
+    with _registry_lock:
+        lock = _load_locks.setdefault(name, threading.Lock())
+    with lock:
+        model = _models.get(name)
+        if model is not None:
+            _stats[name]["reuses"] += 1
+            return model
+
+        from sentence_transformers import SentenceTransformer
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = SentenceTransformer(name)
+        load_seconds = time.perf_counter() - start
+        _stats[name] = {
+            "load_seconds": load_seconds,
+            "rss_delta_bytes": max(0, _rss_bytes() - rss_before),
+            "parameter_bytes": _parameter_bytes(model),
+            "warmup_seconds": None,
+            # calls served by the already loaded model
+            "reuses": 0,
+        }
+        _models[name] = model
+        print(f"Loaded embedding model {name} in {load_seconds:.2f}s")
+        return model
+
+
+def warm_up(names=(DEFAULT_MODEL,)):
+    """
+    Load each model and run a dummy encode so the first real request is not the cold one
+    """
+    for name in names:
+        model = get_embedding_model(name)
+        start = time.perf_counter()
+        model.encode(["warm up"], convert_to_numpy=True)
+        _stats[name]["warmup_seconds"] = time.perf_counter() - start
+    return model_stats()
+
+
+def model_stats():
+    """
+    Load time, warm-up time, reuse count and memory stats for every loaded model
+    """
+    stats = {name: dict(entry) for name, entry in _stats.items()}
+    return {"models": stats, "process_rss_bytes": _rss_bytes()}
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .vector_store import load_embeddings
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, block_size=1 << 20):
+    """
+    Hash a file's bytes in fixed-size blocks
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text):
+    """
+    Hash a chunk's text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_previous_run(manifest_path, chunks_path, store_path, settings):
+    """
+    Load the manifest, chunk records and vectors of the last ingest run.
+
+    Returns None when any artifact is missing, unreadable or was built with
+    different settings (model, chunk size, ...), which forces a full rebuild.
+    """
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        with open(chunks_path, "r") as f:
+            chunk_records = json.load(f)
+        matrix, _ = load_embeddings(store_path)
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return None
+
+    if manifest.get("format_version") != MANIFEST_VERSION:
+        return None
+    if manifest.get("settings") != settings:
+        return None
+    if len(chunk_records) != len(matrix):
+        return None
+    return {"manifest": manifest, "chunks": chunk_records, "matrix": matrix}
+
+
+class IncrementalIngest:
+    """
+    Track which chunks can reuse vectors from the previous run.
+
+    Files whose hash is unchanged keep their chunk records and vector rows
+    as-is. Chunks of new or changed files reuse a previous vector when their
+    text hash matches one, and are queued for embedding otherwise. Rows of
+    deleted files and replaced chunks are dropped when the store is rebuilt.
+    """
+
+    def __init__(self, previous, settings):
+        self.previous = previous
+        self.settings = settings
+        self.records = []
+        self.hashes = []
+        self.files = {}
+        self._sources = []  # ("old", row) or ("new", position in pending)
+        self.pending_texts = []
+        self.reused = 0
+
+        self._previous_files = {}
+        self._previous_rows_by_hash = {}
+        if previous is not None:
+            self._previous_files = previous["manifest"]["files"]
+            for entry in self._previous_files.values():
+                for row, chunk_hash in zip(entry["rows"], entry["chunk_hashes"]):
+                    self._previous_rows_by_hash.setdefault(chunk_hash, row)
+
+    def unchanged_file(self, name, sha):
+        """
+        Reuse every chunk of a file whose content hash has not changed.
+
+        Returns False when the file is new or changed and must be re-chunked.
+        """
+        entry = self._previous_files.get(name)
+        if entry is None or entry["sha256"] != sha:
+            return False
+
+        rows = []
+        for row, chunk_hash in zip(entry["rows"], entry["chunk_hashes"]):
+            rows.append(len(self.records))
+            self.records.append(self.previous["chunks"][row])
+            self.hashes.append(chunk_hash)
+            self._sources.append(("old", row))
+            self.reused += 1
+        self.files[name] = {
+            "sha256": sha,
+            "rows": rows,
+            "chunk_hashes": list(entry["chunk_hashes"]),
+        }
+        return True
+
+    def add_file(self, name, sha, chunk_records):
+        """
+        Register the freshly built chunks of a new or changed file
+        """
+        rows, hashes = [], []
+        for record in chunk_records:
+            chunk_hash = text_sha256(record["text"])
+            rows.append(len(self.records))
+            hashes.append(chunk_hash)
+            self.records.append(record)
+            self.hashes.append(chunk_hash)
+
+            previous_row = self._previous_rows_by_hash.get(chunk_hash)
+            if previous_row is not None:
+                self._sources.append(("old", previous_row))
+                self.reused += 1
+            else:
+                self._sources.append(("new", len(self.pending_texts)))
+                self.pending_texts.append(record["text"])
+        self.files[name] = {"sha256": sha, "rows": rows, "chunk_hashes": hashes}
+
+    def build_matrix(self, new_vectors):
+        """
+        Assemble the compacted (count, dim) matrix from reused rows and new vectors
+        """
+        new_vectors = np.asarray(new_vectors, dtype=np.float32)
+        if len(new_vectors) != len(self.pending_texts):
+            raise ValueError("Expected one new vector per pending chunk.")
+
+        if self.previous is not None and len(self.previous["matrix"]):
+            dim = self.previous["matrix"].shape[1]
+        else:
+            dim = new_vectors.shape[1]
+        matrix = np.empty((len(self.records), dim), dtype=np.float32)
+
+        old_out = [i for i, (kind, _) in enumerate(self._sources) if kind == "old"]
+        new_out = [i for i, (kind, _) in enumerate(self._sources) if kind == "new"]
+        if old_out:
+            old_rows = [self._sources[i][1] for i in old_out]
+            matrix[old_out] = self.previous["matrix"][old_rows]
+        if new_out:
+            matrix[new_out] = new_vectors[[self._sources[i][1] for i in new_out]]
+        return matrix
+
+    def stale_rows(self):
+        """
+        Number of previous rows that are not carried into the new store
+        """
+        if self.previous is None:
+            return 0
+        kept = {row for kind, row in self._sources if kind == "old"}
+        return len(self.previous["matrix"]) - len(kept)
+
+    def manifest(self):
+        return {
+            "format_version": MANIFEST_VERSION,
+            "settings": self.settings,
+            "files": self.files,
+        }
+
+    def report(self):
+        return {
+            "total_chunks": len(self.records),
+            "reused_chunks": self.reused,
+            "recomputed_chunks": len(self.pending_texts),
+            "dropped_rows": self.stale_rows(),
+        }
+
+
+def save_manifest(manifest, filename):
+    """
+    Write the ingest manifest atomically
+    """
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, filename)
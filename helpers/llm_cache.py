@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = "outputs/llm_cache.sqlite"
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def make_cache_key(provider, model, messages, params=None):
+    """
+    Stable hash of everything that determines an LLM response
+    """
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": messages,
+        "params": params or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cache_enabled():
+    """
+    True when the LLM_CACHE environment variable turns the response cache on
+    """
+    return os.getenv("LLM_CACHE", "0").lower() in ("1", "true", "yes")
+
+
+def get_default_cache():
+    """
+    Return the process-wide LlmCache on DEFAULT_CACHE_PATH, opening it on first use
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LlmCache()
+    return _default_cache
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+        self.delta = self.message
+
+
+class CachedResponse:
+    """
+    Stand-in for a chat completion (or a stream chunk) served from the cache
+    """
+
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+        self.usage = None
+
+
+class LlmCache:
+    """
+    Two-level LLM response cache: an in-memory LRU in front of SQLite.
+
+    Entries expire after ttl_seconds (None keeps them forever). Each level is
+    bounded by an entry count and by the summed size of its responses
+    (max_memory_entries / max_memory_bytes and max_disk_entries /
+    max_disk_bytes); over either cap the least recently used entries are
+    evicted, except the one just stored.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        max_memory_entries=256,
+        max_disk_entries=10000,
+        ttl_seconds=7 * 24 * 3600,
+        max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+        max_disk_bytes=DEFAULT_MAX_DISK_BYTES,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "expired": 0,
+            "evicted": 0,
+            "memory_evicted": 0,
+        }
+        # key -> (response, created time)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+        else:
+            self._db = None
+
+    def _is_expired(self, created, now):
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key):
+        """
+        Return the cached response for a key, or None on a miss
+        """
+        now = time.time()
+        expired = False
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._is_expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return value
+                self._forget(key)
+                expired = True
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._is_expired(created, now):
+                        self._db.execute(
+                            "UPDATE responses SET accessed = ? WHERE key = ?",
+                            (now, key),
+                        )
+                        self._db.commit()
+                        self._remember(key, value, created)
+                        self.stats["hits"] += 1
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    expired = True
+
+            if expired:
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Store a response in both levels and evict the least recently used entries
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM responses"
+            ).fetchone()
+            if count > self.max_disk_entries or size > self.max_disk_bytes:
+                # drop every entry past the caps, counted from the most recent
+                cursor = self._db.execute(
+                    "DELETE FROM responses WHERE key != ? AND key IN ("
+                    "SELECT key FROM ("
+                    "SELECT key, ROW_NUMBER() OVER recent AS position, "
+                    "SUM(LENGTH(value)) OVER recent AS running FROM responses "
+                    "WINDOW recent AS (ORDER BY accessed DESC, key = ? DESC)"
+                    ") WHERE position > ? OR running > ?)",
+                    (key, key, self.max_disk_entries, self.max_disk_bytes),
+                )
+                self.stats["evicted"] += cursor.rowcount
+            self._db.commit()
+
+    def record_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def _forget(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    def _remember(self, key, value, created):
+        self._forget(key)
+        self._memory[key] = (value, created)
+        self._memory_bytes += len(value)
+        # keep the response just stored even if it alone is over max_memory_bytes
+        while len(self._memory) > 1 and (
+            len(self._memory) > self.max_memory_entries
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            _, (old_value, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_value)
+            self.stats["memory_evicted"] += 1
+
+    def clear(self):
+        """
+        Drop every cached response
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            if self._db is not None:
+                stats["disk_entries"], stats["disk_bytes"] = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM responses"
+                ).fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,42 +1,73 @@
-# suppress warnings
-import warnings
-
-warnings.filterwarnings("ignore")
-
-# import libraries
-import requests, os
-import textwrap
-import tiktoken
+import asyncio
 import json
-from pathlib import Path
+import os
 import re
+import threading
+import weakref
+
 import helpers
+from .clients import chat_completion, get_client
+from .llm_cache import cache_enabled, get_default_cache
+from .usage import UsageTotals
 
-# dotenv
-from dotenv import load_dotenv
+# serializes writes to the shared intermediate output file
+_response_file_lock = threading.Lock()
 
-load_dotenv()
+_setup_lock = threading.Lock()
+_setup_done = False
 
 
-class LlmModel:
-    def __init__(
-        self, model="meta-llama/Meta-Llama-3-8B-Instruct-Lite", provider="together"
-    ):
-        self.model = model
-        self.total_cost = 0
+def _setup():
+    # suppress warnings and load .env once, when the first model is created
+    # (not at import time, so importing helpers stays cheap)
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return
+        import warnings
 
-        if provider == "together":
-            import together
+        from dotenv import load_dotenv
 
-            self.client = together.Together(api_key=os.getenv("TOGETHER_API_KEY"))
-        elif provider == "openai":
-            import openai
+        warnings.filterwarnings("ignore")
+        load_dotenv()
+        _setup_done = True
 
-            self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        elif provider == "openrouter":
-            import openrouter
 
-            self.client = openrouter.OpenRouter(api_key=os.getenv("OPENROUTER_API_KEY"))
+class LlmModel:
+    def __init__(
+        self,
+        model="meta-llama/Meta-Llama-3-8B-Instruct-Lite",
+        provider="together",
+        cache=None,
+        max_concurrency=4,
+    ):
+        """
+        cache: an LlmCache, True for the shared on-disk cache, False for none,
+        or None to follow the LLM_CACHE environment variable (off unless set
+        to 1). Lookups happen in helpers.chat_completion.
+        max_concurrency: how many aprompt_llm calls may be in flight at once.
+        """
+        _setup()
+        self.model = model
+        self.provider = provider
+        # token, latency and cost totals of this model's calls (see helpers.usage)
+        self.usage = UsageTotals(model)
+        self.max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary()
+
+        if cache is None:
+            cache = cache_enabled()
+        if cache is True:
+            cache = get_default_cache()
+        self.cache = cache or None
+
+        # shared, pooled client per (provider, api key)
+        self.client = get_client(provider)
+
+    @property
+    def total_cost(self):
+        """USD cost of this model's calls so far, from helpers.usage.PRICES_PER_MILLION."""
+        return self.usage.cost_usd
 
     def parse_xml_tags(self, text, tags):
         """Parse specified XML tags from text and verify all tags are present."""
@@ -66,14 +97,33 @@ class LlmModel:
             raise ValueError(f"Missing tags: {', '.join(missing)}")
         return result
 
-    def prompt_llm(self, prompt, get_structured_output=None):
-        response = self.client.chat.completions.create(
+    def prompt_llm(
+        self, prompt, get_structured_output=None, use_cache=True, stream=False, **params
+    ):
+        """
+        Send a prompt and return the (optionally parsed) response.
+
+        Extra keyword arguments (temperature, max_tokens, ...) are passed to the
+        provider and are part of the cache key. use_cache=False skips the cache
+        for this call. stream=True returns a generator of text pieces instead
+        (see stream_llm).
+        """
+        if stream:
+            return self.stream_llm(prompt, use_cache=use_cache, **params)
+
+        response = chat_completion(
+            self.client,
+            usage=self.usage,
+            cache=self.cache or False,
+            use_cache=use_cache,
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
+            **params,
         )
         output = response.choices[0].message.content
         # save intermediate output to a file
-        helpers.save_txt(output, "outputs/llm_response.txt")
+        with _response_file_lock:
+            helpers.save_txt(output, "outputs/llm_response.txt")
         if get_structured_output == "xml":
             return self.parse_xml_tags(output, get_structured_output)
         elif get_structured_output == "json":
@@ -89,6 +139,72 @@ class LlmModel:
                 return self.parse_json_tags(output, get_structured_output)
         return output
 
+    def stream_llm(self, prompt, use_cache=True, **params):
+        """
+        Yield response text pieces as the provider streams them.
+
+        A cache hit is yielded as a single piece. Once the stream is complete
+        the full text is cached and saved like prompt_llm output.
+        """
+        response = chat_completion(
+            self.client,
+            usage=self.usage,
+            cache=self.cache or False,
+            use_cache=use_cache,
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **params,
+        )
+        pieces = []
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            text = getattr(chunk.choices[0].delta, "content", None)
+            if text:
+                pieces.append(text)
+                yield text
+
+        output = "".join(pieces)
+        with _response_file_lock:
+            helpers.save_txt(output, "outputs/llm_response.txt")
+
+    def _semaphore(self):
+        # asyncio semaphores are bound to one event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def aprompt_llm(self, prompt, get_structured_output=None, **kwargs):
+        """
+        Async prompt_llm: runs the blocking call in a worker thread, with at most
+        max_concurrency calls in flight per event loop.
+        """
+        async with self._semaphore():
+            return await asyncio.to_thread(
+                self.prompt_llm, prompt, get_structured_output, **kwargs
+            )
+
+    async def aprompt_many(
+        self, prompts, get_structured_output=None, return_exceptions=False, **kwargs
+    ):
+        """
+        Send independent prompts concurrently and return responses in prompt order
+        """
+        return await asyncio.gather(
+            *(self.aprompt_llm(p, get_structured_output, **kwargs) for p in prompts),
+            return_exceptions=return_exceptions,
+        )
+
+    def prompt_many(self, prompts, get_structured_output=None, **kwargs):
+        """
+        Blocking wrapper around aprompt_many for synchronous callers
+        """
+        return asyncio.run(self.aprompt_many(prompts, get_structured_output, **kwargs))
+
 
 if __name__ == "__main__":
     ### Task 1: YOUR CODE HERE - Write a prompt for the LLM to respond to the user
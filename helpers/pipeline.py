@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .ingest import file_sha256
+from .usage import usage_scope
+
+DEFAULT_STATE_PATH = "outputs/pipeline_state.json"
+
+
+def artifact_digest(path):
+    """
+    sha256 of a file, or of the (relative path, sha256) list of a folder; None if missing
+    """
+    if os.path.isfile(path):
+        return file_sha256(path)
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode("utf-8"))
+                digest.update(file_sha256(full).encode("ascii"))
+        return digest.hexdigest()
+    return None
+
+
+def modified_at(path):
+    """
+    Latest modification time of a file, or of any file in a folder; None if missing
+    """
+    if os.path.isfile(path):
+        return os.stat(path).st_mtime_ns
+    if os.path.isdir(path):
+        times = [
+            os.stat(os.path.join(root, name)).st_mtime_ns
+            for root, _, files in os.walk(path)
+            for name in files
+        ]
+        return max(times, default=None)
+    return None
+
+
+class Stage:
+    """
+    One pipeline step: a callable with the artifacts it reads and writes.
+
+    inputs and outputs are file or folder paths. params are the arguments
+    that change the outputs (they are part of the up-to-date check, like the
+    inputs). after names stages that must run first without sharing a file.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), params=None, after=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.after = list(after)
+
+
+class Pipeline:
+    """
+    Run stages in dependency order, skipping up-to-date ones.
+
+    A stage depends on the stages that write its inputs. It is up to date
+    when its input and output hashes and params match the last successful
+    run recorded in the state file. A run only counts as successful when it
+    rewrote every output: several tasks print their errors and return, so a
+    stale output left in place marks the stage failed. Independent stages
+    run concurrently in a thread pool.
+    """
+
+    def __init__(self, stages, state_path=DEFAULT_STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self._state_lock = threading.Lock()
+
+        producers = {}
+        for stage in stages:
+            for path in stage.outputs:
+                producers[os.path.normpath(path)] = stage.name
+        self.dependencies = {
+            stage.name: {
+                producers[os.path.normpath(path)]
+                for path in stage.inputs
+                if producers.get(os.path.normpath(path)) not in (None, stage.name)
+            }
+            | set(stage.after)
+            for stage in stages
+        }
+        for name, dependencies in self.dependencies.items():
+            unknown = dependencies - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage {name} runs after unknown stages: {sorted(unknown)}")
+
+    def required(self, target=None):
+        """
+        The target stage and everything it depends on (every stage without a target)
+        """
+        if target is None:
+            return set(self.stages)
+        if target not in self.stages:
+            raise ValueError(f"Unknown stage: {target}")
+        needed, todo = set(), [target]
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.dependencies[name])
+        return needed
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp_path, self.state_path)
+
+    def _fingerprint(self, stage):
+        return {
+            "inputs": {path: artifact_digest(path) for path in stage.inputs},
+            "params": stage.params,
+        }
+
+    def _up_to_date(self, stage, previous):
+        if not previous or not stage.outputs:
+            return False
+        if self._fingerprint(stage) != {
+            "inputs": previous.get("inputs"),
+            "params": previous.get("params"),
+        }:
+            return False
+        # outputs must still be the ones this stage wrote
+        return all(
+            artifact_digest(path) == previous.get("outputs", {}).get(path)
+            for path in stage.outputs
+        )
+
+    def _run_stage(self, stage, state, force):
+        if not force and self._up_to_date(stage, state.get(stage.name)):
+            return {"stage": stage.name, "status": "skipped", "seconds": 0.0}
+
+        fingerprint = self._fingerprint(stage)
+        written_before = {path: modified_at(path) for path in stage.outputs}
+        start = time.perf_counter()
+        with usage_scope(stage.name) as usage:
+            stage.run()
+        seconds = time.perf_counter() - start
+
+        outputs = {path: artifact_digest(path) for path in stage.outputs}
+        missing = [path for path, digest in outputs.items() if digest is None]
+        stale = [
+            path
+            for path in stage.outputs
+            if path not in missing and modified_at(path) == written_before[path]
+        ]
+        result = {
+            "stage": stage.name,
+            "status": "failed" if missing or stale else "ran",
+            "seconds": round(seconds, 3),
+            "llm_calls": usage.calls,
+            "llm_cost_usd": round(usage.cost_usd, 6),
+        }
+        if missing or stale:
+            errors = []
+            if missing:
+                errors.append(f"missing outputs: {', '.join(missing)}")
+            if stale:
+                errors.append(f"outputs not rewritten: {', '.join(stale)}")
+            result["error"] = "; ".join(errors)
+            return result
+
+        with self._state_lock:
+            state[stage.name] = dict(
+                fingerprint, outputs=outputs, finished_at=time.time(), seconds=seconds
+            )
+            self._save_state(state)
+        return result
+
+    def run(self, target=None, force=(), max_workers=4):
+        """
+        Run the stages needed for target and return one summary dict per stage.
+
+        force is a collection of stage names to rerun even when up to date
+        (True reruns all). A failed stage blocks the stages that depend on it.
+        """
+        needed = self.required(target)
+        state = self._load_state()
+        pending = {name: set(self.dependencies[name]) & needed for name in needed}
+        results, failed = {}, set()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while pending or running:
+                ready = [n for n, deps in pending.items() if not deps - set(results)]
+                while ready:
+                    for name in ready:
+                        del pending[name]
+                        if self.dependencies[name] & failed:
+                            results[name] = {"stage": name, "status": "blocked", "seconds": 0.0}
+                            failed.add(name)
+                            continue
+                        stage_force = force is True or name in force
+                        future = executor.submit(
+                            self._run_stage, self.stages[name], state, stage_force
+                        )
+                        running[future] = name
+                    # blocked stages may have made their dependents ready
+                    ready = [n for n, deps in pending.items() if not deps - set(results)]
+                if not running:
+                    if pending:
+                        raise ValueError(f"Dependency cycle among: {sorted(pending)}")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = {
+                            "stage": name,
+                            "status": "failed",
+                            "seconds": 0.0,
+                            "error": f"{type(e).__name__}: {e}",
+                        }
+                    if results[name]["status"] == "failed":
+                        failed.add(name)
+
+        order = [name for name in self.stages if name in results]
+        return [results[name] for name in order]
+
+
+def print_summary(results, wall_seconds=None):
+    """
+    Print a per-stage status and timing table
+    """
+    print(f"\n{'stage':<10} {'status':<8} {'seconds':>9} {'llm calls':>10} {'llm $':>10}")
+    for result in results:
+        print(
+            f"{result['stage']:<10} {result['status']:<8} {result['seconds']:>9.2f} "
+            f"{result.get('llm_calls', 0):>10} {result.get('llm_cost_usd', 0.0):>10.4f}"
+        )
+        if result.get("error"):
+            print(f"    {result['error']}")
+    total = sum(result["seconds"] for result in results)
+    print(f"{'total':<10} {'':<8} {total:>9.2f}")
+    if wall_seconds is not None:
+        print(f"{'wall':<10} {'':<8} {wall_seconds:>9.2f}")
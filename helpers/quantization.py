@@ -0,0 +1,175 @@
+import json
+import os
+
+import numpy as np
+
+from .retrieval import normalize_rows, top_k_indices
+
+QUANTIZED_FORMAT_VERSION = 1
+QUANTIZED_KINDS = ("int8", "binary")
+# rows rescored in float32 by default; sign bits are much coarser than int8
+DEFAULT_SHORTLIST = {"int8": 100, "binary": 500}
+
+# set bits per byte value, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(codes):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes)
+    return _POPCOUNT[codes]
+
+
+def quantize_int8(matrix, batch_size=65536):
+    """
+    Symmetric per-dimension int8 quantization; returns (codes, scale) with row ~= codes * scale
+    """
+    dim = matrix.shape[1]
+    max_abs = np.zeros(dim, dtype=np.float32)
+    for start in range(0, len(matrix), batch_size):
+        block = np.asarray(matrix[start : start + batch_size], dtype=np.float32)
+        np.maximum(max_abs, np.abs(block).max(axis=0), out=max_abs)
+    scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    for start in range(0, len(matrix), batch_size):
+        block = np.asarray(matrix[start : start + batch_size], dtype=np.float32)
+        codes[start : start + len(block)] = np.clip(np.rint(block / scale), -127, 127)
+    return codes, scale
+
+
+def quantize_binary(matrix):
+    """
+    1-bit sign quantization packed 8 dimensions per byte
+    """
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+class QuantizedIndex:
+    """
+    Compact int8 and/or binary copies of a normalized float32 matrix.
+
+    A query is scored coarsely on a compact form (int8 dot products, or
+    popcount Hamming distance for binary codes), then only the best
+    `shortlist` rows are rescored exactly against the float32 matrix, which
+    can stay memory-mapped on disk.
+    """
+
+    def __init__(self, matrix, int8_codes=None, int8_scale=None, binary_codes=None):
+        self.matrix = matrix
+        self.int8_codes = int8_codes
+        self.int8_scale = int8_scale
+        self.binary_codes = binary_codes
+
+    @classmethod
+    def build(cls, matrix, kinds=QUANTIZED_KINDS):
+        unknown = set(kinds) - set(QUANTIZED_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown quantization kinds: {sorted(unknown)}")
+        int8_codes = int8_scale = binary_codes = None
+        if "int8" in kinds:
+            int8_codes, int8_scale = quantize_int8(matrix)
+        if "binary" in kinds:
+            binary_codes = quantize_binary(matrix)
+        return cls(matrix, int8_codes, int8_scale, binary_codes)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def kinds(self):
+        return tuple(
+            kind
+            for kind, codes in (("int8", self.int8_codes), ("binary", self.binary_codes))
+            if codes is not None
+        )
+
+    def nbytes(self):
+        """
+        Bytes used by each representation, float32 included for comparison
+        """
+        sizes = {"float32": len(self) * self.matrix.shape[1] * 4}
+        if self.int8_codes is not None:
+            sizes["int8"] = self.int8_codes.nbytes + self.int8_scale.nbytes
+        if self.binary_codes is not None:
+            sizes["binary"] = self.binary_codes.nbytes
+        return sizes
+
+    def coarse_scores(self, query, kind="binary", batch_size=1024):
+        """
+        Approximate scores of every row from a compact form (higher is better)
+        """
+        query = normalize_rows(query)
+        if kind == "int8" and self.int8_codes is not None:
+            # widen small cache-sized blocks to float32 rather than the whole matrix
+            weights = query * self.int8_scale
+            scores = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), batch_size):
+                block = self.int8_codes[start : start + batch_size]
+                scores[start : start + len(block)] = block.astype(np.float32) @ weights
+            return scores
+        if kind == "binary" and self.binary_codes is not None:
+            distance = _popcount(self.binary_codes ^ quantize_binary(query)).sum(
+                axis=1, dtype=np.int32
+            )
+            return -distance
+        raise ValueError(f"No {kind} codes in this index.")
+
+    def search(self, query, k=3, kind="binary", shortlist=None):
+        """
+        Return (rows, scores) of the top-k after rescoring a shortlist in float32
+        """
+        query = normalize_rows(query)
+        shortlist = max(k, shortlist or DEFAULT_SHORTLIST[kind])
+        candidates = top_k_indices(self.coarse_scores(query, kind), shortlist)
+        candidates.sort()  # sequential reads from the memory map
+        scores = np.asarray(self.matrix[candidates], dtype=np.float32) @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        params = {
+            "format_version": QUANTIZED_FORMAT_VERSION,
+            "count": len(self),
+            "kinds": list(self.kinds),
+        }
+        arrays = {"params": np.array(json.dumps(params))}
+        if self.int8_codes is not None:
+            arrays["int8_codes"] = self.int8_codes
+            arrays["int8_scale"] = self.int8_scale
+        if self.binary_codes is not None:
+            arrays["binary_codes"] = self.binary_codes
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        print(f"\nSaved {'/'.join(self.kinds)} codes for {len(self)} vectors to {path}\n")
+
+    @classmethod
+    def load(cls, path, matrix):
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            if params.get("format_version") != QUANTIZED_FORMAT_VERSION:
+                raise ValueError(f"Unsupported quantized index version in {path}")
+            if params["count"] != len(matrix):
+                raise ValueError(f"Quantized index {path} does not match the vector store.")
+            return cls(
+                matrix,
+                data["int8_codes"] if "int8_codes" in data else None,
+                data["int8_scale"] if "int8_scale" in data else None,
+                data["binary_codes"] if "binary_codes" in data else None,
+            )
+
+
+def attach_quantized(index, path):
+    """
+    Attach the quantized codes saved at path to a VectorIndex, if they exist and match
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        index.quantized = QuantizedIndex.load(path, index.matrix)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Ignoring quantized index {path}: {e}")
+        index.quantized = None
+    return index.quantized
@@ -0,0 +1,266 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .embedding_models import DEFAULT_MODEL, get_embedding_model
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_TIMEOUT_S = 10.0
+
+# latencies kept for the p50/p99 stats
+_LATENCY_WINDOW = 10000
+
+
+class QueryTimeout(TimeoutError):
+    """
+    Raised when a query is not answered within its timeout
+    """
+
+
+class _Request:
+    def __init__(self, text, k, method, deadline):
+        self.text = text
+        self.k = k
+        self.method = method
+        self.deadline = deadline
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.cancelled = False
+        self.result = None
+        self.embedding = None
+        self.error = None
+
+
+class QueryService:
+    """
+    Long-lived retrieval service over a preloaded chunk store and index.
+
+    Queries submitted from many threads are collected into micro-batches
+    (up to max_batch_size queries, or whatever arrived within max_wait_ms of
+    the first one), embedded with one encode call and scored with one
+    VectorIndex.score_batch pass. Methods other than "exact" (ivf, hybrid,
+    int8, binary) share the batched encode and are then searched per query;
+    embed() returns only the batched query embedding.
+    """
+
+    def __init__(
+        self,
+        chunk_records,
+        index,
+        model=None,
+        model_name=DEFAULT_MODEL,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms=DEFAULT_MAX_WAIT_MS,
+    ):
+        """
+        model: an object with a SentenceTransformer-style encode(); defaults
+        to the process-wide model_name model (see helpers.embedding_models).
+        """
+        if len(chunk_records) != len(index):
+            raise ValueError("Mismatch between chunk metadata and embeddings.")
+        self.chunk_records = chunk_records
+        self.index = index
+        self.model = model
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max_wait_ms / 1000
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._counts = {
+            "submitted": 0,
+            "completed": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "batches": 0,
+            "batched_queries": 0,
+        }
+        self._started_at = None
+
+    def start(self):
+        """
+        Load the embedding model and start the batching worker (idempotent)
+        """
+        with self._start_lock:
+            if self._worker is not None:
+                return self
+            if self.model is None:
+                self.model = get_embedding_model(self.model_name)
+            self._started_at = time.perf_counter()
+            self._worker = threading.Thread(
+                target=self._run, name="query-service", daemon=True
+            )
+            self._worker.start()
+        return self
+
+    def close(self):
+        """
+        Stop the worker after the queued queries are answered
+        """
+        with self._start_lock:
+            if self._worker is None:
+                return
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def query(
+        self,
+        query_text,
+        k=3,
+        method="exact",
+        timeout=DEFAULT_TIMEOUT_S,
+        with_embedding=False,
+    ):
+        """
+        Return the k nearest chunks as {"score", "chunk"} entries (and the
+        query embedding, as (entries, embedding), with with_embedding=True).
+
+        Blocks until the query's batch is scored; raises QueryTimeout after
+        timeout seconds (a query still waiting in the queue is then dropped).
+        """
+        self.start()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        request = _Request(query_text, k, method, deadline)
+        self._count("submitted")
+        self._queue.put(request)
+
+        if not request.done.wait(timeout):
+            request.cancelled = True
+            self._count("timeouts")
+            raise QueryTimeout(f"Query not answered within {timeout:.3f}s")
+        if request.error is not None:
+            raise request.error
+        if with_embedding:
+            return request.result, request.embedding
+        return request.result
+
+    def embed(self, query_text, timeout=DEFAULT_TIMEOUT_S):
+        """
+        Return the query embedding only, encoded in the same micro-batches
+        """
+        return self.query(query_text, k=0, method=None, timeout=timeout)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _next_batch(self):
+        # block for the first query, then collect more for up to max_wait_s
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        end = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = end - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # answer this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            now = time.perf_counter()
+            live = [
+                r
+                for r in batch
+                if not r.cancelled and (r.deadline is None or r.deadline > now)
+            ]
+            if live:
+                self._answer(live)
+
+    def _answer(self, batch):
+        try:
+            embeddings = np.asarray(
+                self.model.encode(
+                    [r.text for r in batch],
+                    batch_size=len(batch),
+                    convert_to_numpy=True,
+                ),
+                dtype=np.float32,
+            )
+            results = [None] * len(batch)
+            exact = [i for i, r in enumerate(batch) if r.method == "exact"]
+            if exact:
+                k = max(batch[i].k for i in exact)
+                pairs = self.index.search_batch(embeddings[exact], k=k)
+                for i, (nearest, _) in zip(exact, pairs):
+                    results[i] = nearest[: batch[i].k]
+            for i, request in enumerate(batch):
+                if request.method is None:
+                    results[i] = embeddings[i]
+                elif results[i] is None:
+                    results[i], _ = self.index.search(
+                        embeddings[i],
+                        k=request.k,
+                        method=request.method,
+                        query_text=request.text,
+                    )
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            self._count("errors", len(batch))
+            return
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self._counts["batches"] += 1
+            self._counts["batched_queries"] += len(batch)
+            self._counts["completed"] += len(batch)
+            self._latencies.extend(finished - r.submitted for r in batch)
+        for request, embedding, nearest in zip(batch, embeddings, results):
+            request.embedding = embedding
+            if request.method is None:
+                request.result = nearest
+            else:
+                request.result = [
+                    {"score": score, "chunk": self.chunk_records[row]}
+                    for row, score in nearest
+                ]
+            request.done.set()
+
+    def stats(self):
+        """
+        Query counts, mean batch size, p50/p99 latency (ms) and throughput
+        """
+        with self._stats_lock:
+            counts = dict(self._counts)
+            latencies = np.asarray(self._latencies, dtype=np.float64) * 1000
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        stats = dict(
+            counts,
+            queued=self._queue.qsize(),
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=self.max_wait_s * 1000,
+            mean_batch_size=round(counts["batched_queries"] / counts["batches"], 2)
+            if counts["batches"]
+            else 0.0,
+            p50_ms=None,
+            p99_ms=None,
+            queries_per_s=round(counts["completed"] / elapsed, 1) if elapsed else 0.0,
+        )
+        if len(latencies):
+            stats["p50_ms"] = round(float(np.percentile(latencies, 50)), 3)
+            stats["p99_ms"] = round(float(np.percentile(latencies, 99)), 3)
+        return stats
@@ -0,0 +1,151 @@
+import json
+import re
+
+
+def format_context(chunks):
+    """
+    Render chunk records as the "- chunk_id (source): text" lines used in prompts
+    """
+    return "".join(
+        f"- {chunk['chunk_id']} ({chunk.get('source_file', 'unknown')}): {chunk['text']}\n"
+        for chunk in chunks
+    )
+
+
+def build_insight_prompt(query_text, chunks):
+    """
+    Build the Task 10 style generation prompt asking for cited insights as JSON
+    """
+    return f"""
+    You are an analyst answering a research question based on retrieved evidence.
+    Generate at least three insights about the user query. Each insight must include a justification and a citation referencing the source file or chunk where the evidence came from.
+
+    User query:
+    {query_text}
+
+    Retrieved chunks:
+    {format_context(chunks)}
+
+    Return the output as JSON with the format:
+    {{
+        "insights": [
+            {{
+                "insight": "<answer>",
+                "justification": "<why this is true using the chunk text>",
+                "citation": "<source file or chunk_id>"
+            }}
+        ]
+    }}
+
+    output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
+    """
+
+
+def format_history(turns):
+    """
+    Render earlier conversation turns as their question and cited insights
+    """
+    lines = []
+    for number, turn in enumerate(turns, 1):
+        lines.append(f"Q{number}: {turn['query']}\n")
+        for item in turn.get("insights", []):
+            lines.append(
+                f"  - {item.get('insight', '')} [{item.get('citation', 'unknown')}]\n"
+            )
+    return "".join(lines)
+
+
+def build_followup_prompt(query_text, chunks, turns):
+    """
+    Build the generation prompt for a follow-up question.
+
+    Only chunks not sent in an earlier turn are included; earlier evidence is
+    represented by the previous questions and their cited insights.
+    """
+    return f"""
+    You are an analyst answering a follow-up research question based on retrieved evidence.
+    Earlier questions and the insights you gave are listed below; their citations still refer to valid chunks.
+    Generate at least three insights about the follow-up question. Each insight must include a justification and a citation referencing the source file or chunk where the evidence came from.
+
+    Earlier questions and insights:
+    {format_history(turns)}
+    Follow-up question:
+    {query_text}
+
+    Newly retrieved chunks:
+    {format_context(chunks) or "(none: answer from the earlier insights)"}
+
+    Return the output as JSON with the format:
+    {{
+        "insights": [
+            {{
+                "insight": "<answer>",
+                "justification": "<why this is true using the chunk text>",
+                "citation": "<source file or chunk_id>"
+            }}
+        ]
+    }}
+
+    output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
+    """
+
+
+def build_synthesis_prompt(question, hops):
+    """
+    Build the prompt merging per-subquestion insights into answers to the main question.
+
+    hops are {"subquestion", "insights"} dicts; citations are kept as given.
+    """
+    findings = "".join(
+        f"Subquestion {number}: {hop['subquestion']}\n"
+        + "".join(
+            f"  - {item.get('insight', '')} (justification: {item.get('justification', '')}) "
+            f"[{item.get('citation', 'unknown')}]\n"
+            for item in hop.get("insights", [])
+        )
+        for number, hop in enumerate(hops, 1)
+    )
+    return f"""
+    You are an analyst writing the final answer to a multi-part research question.
+    The question was split into subquestions, each answered with cited insights from retrieved evidence.
+    Merge them into at least three insights that answer the main question. Combine overlapping insights, keep each insight's justification, and keep the original citations (source file or chunk_id); do not invent new ones.
+
+    Main question:
+    {question}
+
+    Findings per subquestion:
+    {findings}
+    Return the output as JSON with the format:
+    {{
+        "insights": [
+            {{
+                "insight": "<answer>",
+                "justification": "<why this is true using the findings>",
+                "citation": "<source file or chunk_id>"
+            }}
+        ]
+    }}
+
+    output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
+    """
+
+
+def parse_json_output(output):
+    """
+    Parse a JSON object from LLM output, tolerating text around it
+    """
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError:
+        json_match = re.search(r"\{.*\}", output, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(0))
+        raise ValueError("No JSON found in response")
+
+
+def parse_insights(output):
+    """
+    Return the "insights" list from a generation response (empty if missing)
+    """
+    insights = parse_json_output(output).get("insights", [])
+    return insights if isinstance(insights, list) else []
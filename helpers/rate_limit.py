@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from collections import deque
+
+# requests and tokens per minute allowed per provider; LLM_RPM / LLM_TPM override
+DEFAULT_LIMITS = {
+    "together": (600, 180_000),
+    "openai": (500, 200_000),
+    "openrouter": (200, 100_000),
+}
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 32
+# completion tokens assumed for a request without max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at rate_per_minute, holding up to one minute's worth.
+
+    reserve() takes the tokens right away, letting the balance go negative,
+    and returns how long the caller must wait for them. Callers are served
+    in the order they reserved, so a large request cannot be starved.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # a request larger than the bucket still goes through once it is full
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount):
+        # give back tokens reserved for an estimate that turned out too high
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AimdController:
+    """
+    Concurrency limit adjusted additively up and multiplicatively down (AIMD).
+
+    The limit grows by one after `limit` requests complete without being
+    throttled while the limit was fully used (about one step per round of
+    requests) and shrinks by `decrease` on a throttle. acquire() returns a
+    ticket to hand back to release(); only requests sent after the last
+    decrease can shrink the limit again, so one burst of 429s counts once.
+    """
+
+    def __init__(
+        self,
+        initial=DEFAULT_CONCURRENCY,
+        minimum=1,
+        maximum=DEFAULT_MAX_CONCURRENCY,
+        decrease=0.5,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._successes = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            # (epoch, whether this request filled the limit)
+            return self._epoch, self.in_flight >= int(self.limit)
+
+    def release(self, ticket, throttled=False):
+        epoch, saturated = ticket
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self._successes = 0
+                if epoch == self._epoch:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._epoch += 1
+            elif saturated:
+                self._successes += 1
+                if self._successes >= int(self.limit):
+                    self._successes = 0
+                    self.limit = min(self.maximum, self.limit + 1)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Requests/min and tokens/min buckets plus an AIMD concurrency limit for one provider.
+
+    Shared by every thread calling that provider; asyncio callers reach it
+    through asyncio.to_thread (LlmModel.aprompt_llm). acquire() waits for the
+    rate budget, then for a concurrency slot, so the slots count only
+    requests actually sent. Throttling backs off through the concurrency
+    limit alone. Queue waits and throttle events are kept for get_stats().
+    """
+
+    def __init__(
+        self,
+        provider,
+        rpm,
+        tpm,
+        initial_concurrency=DEFAULT_CONCURRENCY,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AimdController(initial_concurrency, maximum=max_concurrency)
+        self.stats = {
+            "requests": 0,
+            "throttle_events": 0,
+            "tokens_reserved": 0,
+            "queue_wait_s": 0.0,
+        }
+        self._waits = deque(maxlen=2048)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """
+        Wait for rate budget and a concurrency slot; returns the ticket for release()
+        """
+        start = time.perf_counter()
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay:
+            time.sleep(delay)
+        ticket = self.concurrency.acquire()
+        self._record(tokens, time.perf_counter() - start)
+        return ticket
+
+    def _record(self, tokens, waited):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["tokens_reserved"] += tokens
+            self.stats["queue_wait_s"] += waited
+            self._waits.append(waited)
+
+    def release(self, ticket, throttled=False, unused_tokens=0):
+        """
+        Free the slot and refund unused tokens; throttled=True backs off concurrency
+        """
+        if throttled:
+            with self._lock:
+                self.stats["throttle_events"] += 1
+        if unused_tokens > 0:
+            self.tokens.refund(unused_tokens)
+        self.concurrency.release(ticket, throttled)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            waits = sorted(self._waits)
+        stats["queue_wait_s"] = round(stats["queue_wait_s"], 3)
+        # numpy stays out of this module: it is imported with helpers at startup
+        for name, q in (("queue_wait_p50_s", 0.50), ("queue_wait_p99_s", 0.99)):
+            stats[name] = round(waits[int(q * (len(waits) - 1))], 4) if waits else 0.0
+        stats["throttle_rate"] = (
+            stats["throttle_events"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        stats["peak_in_flight"] = self.concurrency.peak_in_flight
+        return stats
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def get_limiter(provider="together"):
+    """
+    Return the process-wide RateLimiter for a provider, creating it on first use
+    """
+    limiter = _limiters.get(provider)
+    if limiter is not None:
+        return limiter
+    with _limiters_lock:
+        if provider not in _limiters:
+            rpm, tpm = DEFAULT_LIMITS.get(provider, DEFAULT_LIMITS["together"])
+            _limiters[provider] = RateLimiter(
+                provider,
+                rpm=_env_int("LLM_RPM", rpm),
+                tpm=_env_int("LLM_TPM", tpm),
+                initial_concurrency=_env_int("LLM_CONCURRENCY", DEFAULT_CONCURRENCY),
+                max_concurrency=_env_int("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+            )
+    return _limiters[provider]
+
+
+def provider_of(client):
+    """
+    Provider name of an SDK client, from the package its class comes from
+    """
+    return type(client).__module__.split(".")[0]
+
+
+def rate_limit_stats():
+    """
+    Limiter metrics (queue wait, throttle events, concurrency) by provider
+    """
+    return {provider: limiter.get_stats() for provider, limiter in list(_limiters.items())}
@@ -0,0 +1,190 @@
+import json
+import re
+
+import numpy as np
+
+from .embedding_models import DEFAULT_MODEL, get_embedding_model
+from .rag import parse_json_output
+
+# cosine similarity (all-MiniLM-L6-v2) above which a ground-truth answer counts
+# as covered without asking the judge, and below which it counts as missed
+DEFAULT_MATCH_THRESHOLD = 0.8
+DEFAULT_MISS_THRESHOLD = 0.4
+
+_number_pattern = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _numbers(text):
+    return set(_number_pattern.findall(text))
+
+
+def similarity_matrix(answers, insights, model):
+    """
+    Cosine similarity of every ground-truth answer (rows) to every insight
+    (columns), from one encode call and one matrix product
+    """
+    embeddings = model.encode(
+        list(answers) + list(insights),
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings[: len(answers)] @ embeddings[len(answers) :].T
+
+
+def prescore(
+    answers,
+    insights,
+    model,
+    match_threshold=DEFAULT_MATCH_THRESHOLD,
+    miss_threshold=DEFAULT_MISS_THRESHOLD,
+):
+    """
+    Decide locally which ground-truth answers are clearly covered or missed.
+
+    Returns one {"answer", "best_insight", "similarity", "decision"} dict per
+    answer, decision being "match", "miss" or "ambiguous". A close insight
+    that does not state every number in the answer is never a local match:
+    embeddings barely tell 35 percent from 42 percent.
+    """
+    if not insights:
+        return [
+            {"answer": a, "best_insight": None, "similarity": 0.0, "decision": "miss"}
+            for a in answers
+        ]
+    similarity = similarity_matrix(answers, insights, model)
+    decisions = []
+    for answer, row in zip(answers, similarity):
+        best = int(np.argmax(row))
+        score = float(row[best])
+        if score >= match_threshold and _numbers(answer) <= _numbers(insights[best]):
+            decision = "match"
+        elif score < miss_threshold:
+            decision = "miss"
+        else:
+            decision = "ambiguous"
+        decisions.append(
+            {
+                "answer": answer,
+                "best_insight": insights[best],
+                "similarity": round(score, 4),
+                "decision": decision,
+            }
+        )
+    return decisions
+
+
+def build_judge_prompt(query_text, answers, insights):
+    """
+    Ask the LLM judge how well the predicted insights cover each ground-truth answer
+    """
+    return f"""
+    You are an evaluator.
+    User Query: {query_text}
+
+    Ground Truth Answers:
+    {json.dumps(list(answers), indent=2)}
+
+    Predicted Insights:
+    {json.dumps(list(insights), indent=2)}
+
+    For each ground truth answer, determine if it is adequately covered by the predicted insights. Provide a score from 0 to 1 for each, where 1 means fully covered, 0 means not covered.
+
+    Return the output in JSON format:
+    {{
+        "individual_scores": [<float between 0 and 1>, ...],
+        "reasoning": "<string>"
+    }}
+
+    output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
+    """
+
+
+def _judge_scores(judge, query_text, answers, insights):
+    output = parse_json_output(judge(build_judge_prompt(query_text, answers, insights)))
+    scores = [float(s) for s in output.get("individual_scores", [])]
+    if len(scores) != len(answers):
+        raise ValueError(
+            f"Judge returned {len(scores)} scores for {len(answers)} answers"
+        )
+    return scores, output.get("reasoning", "")
+
+
+def evaluate_recall(
+    query_text,
+    answers,
+    insights,
+    judge,
+    mode="prescore",
+    model=None,
+    check_agreement=False,
+    match_threshold=DEFAULT_MATCH_THRESHOLD,
+    miss_threshold=DEFAULT_MISS_THRESHOLD,
+):
+    """
+    Recall of predicted insights against ground-truth answers.
+
+    judge is a callable prompt -> LLM output text. mode="llm" sends every
+    answer to the judge. mode="prescore" scores clear matches (1) and clear
+    misses (0) locally with embeddings and sends only the ambiguous answers
+    to the judge, in one call (none when nothing is ambiguous). If the
+    embedding model cannot be loaded it falls back to mode="llm".
+    check_agreement=True also runs the pure LLM judge and reports how often
+    the local decisions agree with it.
+    """
+    answers, insights = list(answers), [str(i) for i in insights]
+    report = {"mode": mode, "judge_calls": 0}
+    decisions = None
+    if mode == "prescore":
+        try:
+            model = model or get_embedding_model(DEFAULT_MODEL)
+            decisions = prescore(answers, insights, model, match_threshold, miss_threshold)
+        except (ImportError, OSError) as e:
+            print(f"Embedding pre-scorer unavailable ({e}); using the LLM judge only.")
+            report["mode"] = "llm"
+    elif mode != "llm":
+        raise ValueError(f"Unknown recall evaluation mode: {mode}")
+
+    if decisions is None:
+        scores, reasoning = _judge_scores(judge, query_text, answers, insights)
+        report["judge_calls"] = 1
+    else:
+        scores = [1.0 if d["decision"] == "match" else 0.0 for d in decisions]
+        ambiguous = [i for i, d in enumerate(decisions) if d["decision"] == "ambiguous"]
+        reasoning = "Clear matches and misses scored by embedding similarity."
+        if ambiguous:
+            judged, judge_reasoning = _judge_scores(
+                judge, query_text, [answers[i] for i in ambiguous], insights
+            )
+            for i, score in zip(ambiguous, judged):
+                scores[i] = score
+                decisions[i]["judge_score"] = score
+            reasoning = f"{reasoning} Judge on ambiguous answers: {judge_reasoning}"
+            report["judge_calls"] = 1
+        report["decisions"] = decisions
+        report["decided_locally"] = len(answers) - len(ambiguous)
+        report["escalated"] = len(ambiguous)
+        # the pure LLM judge makes one call covering every answer
+        report["judge_calls_avoided"] = 1 - report["judge_calls"]
+        report["comparisons_avoided"] = len(answers) - len(ambiguous)
+
+    report["individual_scores"] = scores
+    report["overall_recall"] = sum(scores) / len(scores) if scores else 0.0
+    report["reasoning"] = reasoning
+
+    if check_agreement and decisions is not None:
+        llm_scores, _ = _judge_scores(judge, query_text, answers, insights)
+        local = [
+            (d["decision"] == "match", llm >= 0.5)
+            for d, llm in zip(decisions, llm_scores)
+            if d["decision"] != "ambiguous"
+        ]
+        report["agreement"] = {
+            "llm_individual_scores": llm_scores,
+            "llm_overall_recall": sum(llm_scores) / len(llm_scores) if llm_scores else 0.0,
+            "local_decisions": len(local),
+            "agreeing": sum(a == b for a, b in local),
+            "agreement_rate": sum(a == b for a, b in local) / len(local) if local else None,
+        }
+    return report
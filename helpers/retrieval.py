@@ -0,0 +1,183 @@
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """
+    L2-normalize the last axis of a vector or matrix as float32 (zero rows stay zero)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k, largest=True):
+    """
+    Return the indices of the k best scores along the last axis, best first.
+
+    Uses np.argpartition so only the selected k entries are sorted.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[-1]
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    keyed = -scores if largest else scores
+    if k < n:
+        part = np.argpartition(keyed, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(np.take_along_axis(keyed, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+class VectorIndex:
+    """
+    Exact cosine-similarity index over a pre-normalized float32 matrix.
+
+    Scoring a query is one matrix-vector product and scoring a batch of
+    queries is one matrix-matrix product. An optional ANN index (see
+    helpers.ann) can be attached and selected per query with method="ivf",
+    an optional BM25 index (see helpers.bm25) with method="hybrid", and
+    optional quantized codes (see helpers.quantization) with method="int8"
+    or method="binary".
+    """
+
+    def __init__(
+        self, embeddings, normalized=False, ann=None, lexical=None, quantized=None
+    ):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError("Embeddings must be a 2D array of shape (count, dim).")
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.ann = ann
+        self.lexical = lexical
+        self.quantized = quantized
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def score(self, query):
+        """
+        Cosine similarity of one query vector against every row
+        """
+        return self.matrix @ normalize_rows(query)
+
+    def score_batch(self, queries):
+        """
+        Cosine similarity of a (q, dim) batch of queries against every row
+        """
+        return normalize_rows(queries) @ self.matrix.T
+
+    def search(
+        self,
+        query,
+        k=3,
+        furthest_k=0,
+        method="exact",
+        n_probe=None,
+        query_text=None,
+        candidates=None,
+    ):
+        """
+        Return (nearest, furthest) lists of (row, score) for one query.
+
+        method="ivf" takes the nearest rows from the attached ANN index and
+        falls back to exact scoring when no index is attached or it returns
+        fewer than k rows. method="hybrid" fuses the top candidates of exact
+        cosine and BM25 (on query_text) with reciprocal-rank fusion; scores
+        are then RRF scores. It falls back to exact scoring without a BM25
+        index or query text. method="int8" / "binary" scores the compact
+        codes, rescores a shortlist of `candidates` rows in float32 and falls
+        back to exact scoring without them. `candidates` defaults to 50 for
+        hybrid and to helpers.quantization.DEFAULT_SHORTLIST otherwise. Furthest rows always come from
+        exact scoring.
+        """
+        if method == "hybrid" and self.lexical is not None and query_text:
+            from .bm25 import reciprocal_rank_fusion
+
+            scores = self.score(query)
+            pool = max(candidates or 50, k)
+            lexical_rows, _ = self.lexical.search(query_text, pool)
+            fused = reciprocal_rank_fusion([top_k_indices(scores, pool), lexical_rows])
+            _, furthest = _select(scores, 0, furthest_k)
+            return fused[:k], furthest
+        elif method == "ivf" and self.ann is not None:
+            rows, scores = self.ann.search(query, k=k, n_probe=n_probe)
+            if len(rows) >= min(k, len(self)):
+                nearest = [(int(r), float(s)) for r, s in zip(rows, scores)]
+                furthest = []
+                if furthest_k:
+                    _, furthest = _select(self.score(query), 0, furthest_k)
+                return nearest, furthest
+        elif (
+            method in ("int8", "binary")
+            and self.quantized is not None
+            and method in self.quantized.kinds
+        ):
+            rows, scores = self.quantized.search(
+                query, k=k, kind=method, shortlist=candidates
+            )
+            nearest = [(int(r), float(s)) for r, s in zip(rows, scores)]
+            furthest = []
+            if furthest_k:
+                _, furthest = _select(self.score(query), 0, furthest_k)
+            return nearest, furthest
+        elif method not in ("exact", "ivf", "hybrid", "int8", "binary"):
+            raise ValueError(f"Unknown search method: {method}")
+
+        scores = self.score(query)
+        return _select(scores, k, furthest_k)
+
+    def search_batch(self, queries, k=3, furthest_k=0):
+        """
+        Return one (nearest, furthest) pair per query, scored in a single pass
+        """
+        scores = self.score_batch(queries)
+        return [_select(row, k, furthest_k) for row in scores]
+
+
+def _select(scores, k, furthest_k):
+    nearest = [(int(i), float(scores[i])) for i in top_k_indices(scores, k)]
+    furthest = [
+        (int(i), float(scores[i]))
+        for i in top_k_indices(scores, furthest_k, largest=False)
+    ]
+    return nearest, furthest
+
+
+def search_chunks(
+    index,
+    chunk_records,
+    query_embedding,
+    k=3,
+    furthest_k=0,
+    method="exact",
+    n_probe=None,
+    query_text=None,
+):
+    """
+    Score chunk metadata against a query embedding (and query_text for method="hybrid").
+
+    Returns (nearest, furthest) as lists of {"score", "chunk"} entries, the
+    same shape task 9 writes to outputs/task_9_retrieval_results.json.
+    """
+    if len(chunk_records) != len(index):
+        raise ValueError("Mismatch between chunk metadata and embeddings.")
+    nearest, furthest = index.search(
+        query_embedding,
+        k=k,
+        furthest_k=furthest_k,
+        method=method,
+        n_probe=n_probe,
+        query_text=query_text,
+    )
+    return (
+        [{"score": score, "chunk": chunk_records[row]} for row, score in nearest],
+        [{"score": score, "chunk": chunk_records[row]} for row, score in furthest],
+    )
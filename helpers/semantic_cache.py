@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .retrieval import normalize_rows
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_MAX_ENTRIES = 512
+
+
+def corpus_version(paths):
+    """
+    Hash of the files a retrieval corpus is built from (missing files count as empty)
+    """
+    from .ingest import file_sha256
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode("utf-8"))
+        digest.update((file_sha256(path) if os.path.isfile(path) else "-").encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def corpus_stamp(paths):
+    """
+    Cheap (mtime, size) signature used to notice that a corpus file was rewritten
+    """
+    stamp = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            stamp.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query-embedding similarity.
+
+    An entry stores the query embedding, the set of retrieved chunk ids, the
+    corpus version and the answer. A lookup hits when an entry of the same
+    corpus version retrieved exactly the same chunk set and its query is
+    within a cosine threshold of the new one, so paraphrases reuse an answer
+    but a question that retrieves different evidence does not. Entries are
+    evicted least recently used first.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            # a similar query whose retrieved chunk set changed
+            "evidence_changed": 0,
+            "stored": 0,
+            "evicted": 0,
+            "invalidated": 0,
+            "latency_saved_s": 0.0,
+        }
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(self, query_embedding, chunk_ids, version):
+        """
+        Return the cached entry dict for a query, or None on a miss
+        """
+        query = normalize_rows(query_embedding)
+        chunk_set = frozenset(chunk_ids)
+        start = time.perf_counter()
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e["version"] == version]
+            best_key, best_score, evidence_changed = None, self.threshold, False
+            if keys:
+                matrix = np.stack([self._entries[k]["embedding"] for k in keys])
+                scores = matrix @ query
+                for key, score in zip(keys, scores):
+                    if score < self.threshold:
+                        continue
+                    if self._entries[key]["chunk_ids"] != chunk_set:
+                        evidence_changed = True
+                    elif score >= best_score:
+                        best_key, best_score = key, float(score)
+
+            if best_key is None:
+                self.stats["misses"] += 1
+                self.stats["evidence_changed"] += evidence_changed
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self.stats["hits"] += 1
+            self.stats["latency_saved_s"] += max(
+                0.0, entry["latency_s"] - (time.perf_counter() - start)
+            )
+            return dict(entry, similarity=best_score)
+
+    def put(self, query_text, query_embedding, chunk_ids, version, answer, latency_s):
+        """
+        Store an answer with the seconds it took to generate (the latency a hit saves)
+        """
+        entry = {
+            "query": query_text,
+            "embedding": normalize_rows(query_embedding),
+            "chunk_ids": frozenset(chunk_ids),
+            "version": version,
+            "answer": answer,
+            "latency_s": latency_s,
+            "created": time.time(),
+        }
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            self.stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def invalidate(self, keep_version=None):
+        """
+        Drop every entry not built from keep_version (all entries without one)
+        """
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e["version"] != keep_version]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+        return len(stale)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["latency_saved_s"] = round(stats["latency_saved_s"], 3)
+        return stats
@@ -0,0 +1,182 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_MAX_SESSIONS = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 3600
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class SessionStore:
+    """
+    Conversation sessions in an in-memory LRU, bounded by count and bytes.
+
+    Sessions are JSON-serializable dicts. They expire ttl_seconds after their
+    last access. When the memory level is over max_sessions or max_bytes the
+    least recently used sessions are evicted, and spilled to the SQLite file
+    at spill_path if one is given (a later get() loads them back). Without a
+    spill path evicted sessions are dropped. Wrap a get() ... put() update in
+    lock(session_id) so concurrent turns of one session do not overwrite
+    each other.
+    """
+
+    def __init__(
+        self,
+        max_sessions=DEFAULT_MAX_SESSIONS,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        spill_path=None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_path = spill_path
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "spill_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evicted": 0,
+            "spilled": 0,
+        }
+        # session id -> (session json, last access time)
+        self._memory = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # session id -> [lock, number of holders and waiters]
+        self._session_locks = {}
+
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(spill_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+        else:
+            self._db = None
+
+    @contextlib.contextmanager
+    def lock(self, session_id):
+        """
+        Hold a session's lock, e.g. around reading, updating and storing a turn
+        """
+        with self._lock:
+            entry = self._session_locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._session_locks[session_id]
+
+    def _is_expired(self, accessed, now):
+        return self.ttl_seconds is not None and now - accessed > self.ttl_seconds
+
+    def get(self, session_id):
+        """
+        Return a copy of the session dict, or None if it is unknown or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(session_id)
+            if entry is not None:
+                value, accessed = entry
+                if not self._is_expired(accessed, now):
+                    self._memory[session_id] = (value, now)
+                    self._memory.move_to_end(session_id)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return json.loads(value)
+                self._forget(session_id)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, accessed FROM sessions WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+                    )
+                    self._db.commit()
+                    value, accessed = row
+                    if not self._is_expired(accessed, now):
+                        self._remember(session_id, value, now)
+                        self.stats["hits"] += 1
+                        self.stats["spill_hits"] += 1
+                        return json.loads(value)
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, session_id, session):
+        """
+        Store a session and evict the least recently used ones over the caps
+        """
+        value = json.dumps(session)
+        with self._lock:
+            self._remember(session_id, value, time.time())
+
+    def delete(self, session_id):
+        with self._lock:
+            self._forget(session_id)
+            if self._db is not None:
+                self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._db.commit()
+
+    def _forget(self, session_id):
+        entry = self._memory.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def _remember(self, session_id, value, accessed):
+        self._forget(session_id)
+        self._memory[session_id] = (value, accessed)
+        self._bytes += len(value)
+        # keep the session just stored even if it alone is over max_bytes
+        while len(self._memory) > 1 and (
+            len(self._memory) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            old_id, (old_value, old_accessed) = self._memory.popitem(last=False)
+            self._bytes -= len(old_value)
+            self.stats["evicted"] += 1
+            if self._db is not None and not self._is_expired(old_accessed, time.time()):
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, value, accessed) "
+                    "VALUES (?, ?, ?)",
+                    (old_id, old_value, old_accessed),
+                )
+                self._db.commit()
+                self.stats["spilled"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_sessions"] = len(self._memory)
+            stats["memory_bytes"] = self._bytes
+            if self._db is not None:
+                (stats["spilled_sessions"],) = self._db.execute(
+                    "SELECT COUNT(*) FROM sessions"
+                ).fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
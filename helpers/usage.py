@@ -0,0 +1,246 @@
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+DEFAULT_METRICS_PATH = "outputs/llm_metrics.jsonl"
+
+# USD per million tokens as (input, output); unknown models are recorded without cost
+PRICES_PER_MILLION = {
+    "meta-llama/Meta-Llama-3-8B-Instruct-Lite": (0.10, 0.10),
+    "deepseek-ai/DeepSeek-V3.1": (0.60, 1.70),
+}
+
+# identifies this process's records in the shared metrics file
+RUN_ID = uuid.uuid4().hex[:12]
+
+_scopes = contextvars.ContextVar("llm_usage_scopes", default=())
+_file_lock = threading.Lock()
+
+
+class UsageTotals:
+    """
+    Thread-safe running totals of LLM calls for a run, a scope or a model
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cached_calls = 0
+        self.estimated_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.unpriced_calls = 0
+        self.latency_s = 0.0
+
+    def add(self, record):
+        with self._lock:
+            self.calls += 1
+            self.cached_calls += record["cached"]
+            self.estimated_calls += record["usage_source"] == "estimate"
+            self.prompt_tokens += record["prompt_tokens"]
+            self.completion_tokens += record["completion_tokens"]
+            if record["cost_usd"] is None:
+                self.unpriced_calls += 1
+            else:
+                self.cost_usd += record["cost_usd"]
+            self.latency_s += record["latency_s"]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "cached_calls": self.cached_calls,
+                "estimated_calls": self.estimated_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "unpriced_calls": self.unpriced_calls,
+                "latency_s": round(self.latency_s, 3),
+            }
+
+
+_run_totals = UsageTotals("run")
+
+
+def metrics_path():
+    """
+    JSONL file records are appended to (LLM_METRICS_PATH; empty disables the file)
+    """
+    return os.getenv("LLM_METRICS_PATH", DEFAULT_METRICS_PATH)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """
+    USD cost of a call from PRICES_PER_MILLION, or None for unknown models
+    """
+    prices = PRICES_PER_MILLION.get(model)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def estimate_tokens(text):
+    """
+    tiktoken count of a text, or a 4-characters-per-token guess without an encoding
+    """
+    if not text:
+        return 0
+    try:
+        from .chunker import count_tokens
+
+        return count_tokens(text)
+    except Exception:
+        return max(1, len(text) // 4)
+
+
+def usage_of(response):
+    """
+    (prompt_tokens, completion_tokens) reported by a response or stream chunk, if any
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    else:
+        prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+    if prompt is None or completion is None:
+        return None
+    return int(prompt), int(completion)
+
+
+def _write(record):
+    path = metrics_path()
+    if not path:
+        return
+    line = json.dumps(record) + "\n"
+    with _file_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def record_call(
+    model,
+    messages,
+    output,
+    latency_s,
+    ttft_s=None,
+    reported=None,
+    cached=False,
+    stream=False,
+    totals=None,
+):
+    """
+    Record one LLM call in the run totals, every active usage_scope, the
+    optional extra totals, and the metrics file.
+
+    reported is (prompt_tokens, completion_tokens) from the provider; without
+    it both counts are estimated with tiktoken. Cache hits cost nothing.
+    """
+    if cached:
+        prompt_tokens, completion_tokens, source = 0, 0, "cache"
+    elif reported is not None:
+        prompt_tokens, completion_tokens = reported
+        source = "provider"
+    else:
+        prompt_text = "\n".join(str(m.get("content", "")) for m in messages or [])
+        prompt_tokens = estimate_tokens(prompt_text)
+        completion_tokens = estimate_tokens(output)
+        source = "estimate"
+
+    scopes = _scopes.get()
+    record = {
+        "type": "call",
+        "run_id": RUN_ID,
+        "time": time.time(),
+        "scope": "/".join(scope.name for scope in scopes) or None,
+        "model": model,
+        "cached": cached,
+        "stream": stream,
+        "usage_source": source,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": 0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens),
+        "latency_s": round(latency_s, 4),
+        "ttft_s": None if ttft_s is None else round(ttft_s, 4),
+    }
+    _run_totals.add(record)
+    for scope in scopes:
+        scope.add(record)
+    if totals is not None:
+        totals.add(record)
+    _write(record)
+    return record
+
+
+def track_stream(stream, model, messages, start, totals=None):
+    """
+    Pass stream chunks through, then record the call with its time to first token
+    """
+    first_token, pieces, reported = None, [], None
+    try:
+        for chunk in stream:
+            reported = usage_of(chunk) or reported
+            choices = getattr(chunk, "choices", None)
+            text = getattr(choices[0].delta, "content", None) if choices else None
+            if text:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pieces.append(text)
+            yield chunk
+    finally:
+        end = time.perf_counter()
+        record_call(
+            model,
+            messages,
+            "".join(pieces),
+            end - start,
+            ttft_s=None if first_token is None else first_token - start,
+            reported=reported,
+            stream=True,
+            totals=totals,
+        )
+
+
+@contextlib.contextmanager
+def usage_scope(name):
+    """
+    Collect the usage of every LLM call made inside the block (including
+    asyncio tasks and to_thread calls started from it) into a UsageTotals;
+    scopes nest. A summary record is written to the metrics file on exit.
+    """
+    totals = UsageTotals(name)
+    token = _scopes.set(_scopes.get() + (totals,))
+    start = time.perf_counter()
+    try:
+        yield totals
+    finally:
+        _scopes.reset(token)
+        if totals.calls:
+            _write(
+                dict(
+                    totals.snapshot(),
+                    type="scope",
+                    run_id=RUN_ID,
+                    time=time.time(),
+                    wall_s=round(time.perf_counter() - start, 3),
+                )
+            )
+
+
+def run_totals():
+    """
+    Usage totals of every LLM call made by this process
+    """
+    return dict(_run_totals.snapshot(), run_id=RUN_ID)
@@ -0,0 +1,135 @@
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+VECTOR_STORE_VERSION = 1
+
+
+def header_path(path):
+    """
+    Return the JSON header path that sits next to a vector store file
+    """
+    return os.path.splitext(path)[0] + ".json"
+
+
+def save_vector_store(embeddings, path, model_name, normalized=False):
+    """
+    Save embeddings as a contiguous float32 .npy file plus a JSON header.
+
+    The header records the format version, dim, count, model name, whether
+    the rows are already L2-normalized and the size and mtime of the .npy it
+    describes. Both files are written to a temporary name first and renamed,
+    so readers never see a half-written store, and open_vector_store() can
+    tell a matrix from one save and a header from another apart.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        raise ValueError("Embeddings must be a 2D array of shape (count, dim).")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    out = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.float32, shape=matrix.shape
+    )
+    out[:] = matrix
+    out.flush()
+    del out
+    # os.replace keeps the mtime, so these identify the matrix once it is in place
+    data_stat = os.stat(tmp_path)
+
+    header = {
+        "format_version": VECTOR_STORE_VERSION,
+        "dtype": "float32",
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "model": model_name,
+        "normalized": bool(normalized),
+        "data_size": data_stat.st_size,
+        "data_mtime_ns": data_stat.st_mtime_ns,
+    }
+    tmp_header = header_path(path) + ".tmp"
+    with open(tmp_header, "w") as f:
+        json.dump(header, f, indent=4)
+
+    os.replace(tmp_path, path)
+    os.replace(tmp_header, header_path(path))
+    print(f"\nSaved {header['count']} x {header['dim']} vectors to {path}\n")
+    return header
+
+
+def _read_store(path):
+    with open(header_path(path), "r") as f:
+        header = json.load(f)
+    if header.get("format_version") != VECTOR_STORE_VERSION:
+        raise ValueError(
+            f"Unsupported vector store version {header.get('format_version')} in {path}"
+        )
+
+    before = os.stat(path)
+    matrix = np.load(path, mmap_mode="r")
+    after = os.stat(path)
+    data = (after.st_size, after.st_mtime_ns)
+    matches = (
+        (before.st_size, before.st_mtime_ns) == data
+        and matrix.dtype == np.float32
+        and matrix.shape == (header["count"], header["dim"])
+        # stores saved before the header recorded its .npy are checked by shape only
+        and header.get("data_size", data[0]) == data[0]
+        and header.get("data_mtime_ns", data[1]) == data[1]
+    )
+    return matrix, header, matches
+
+
+def open_vector_store(path, retry_delay=0.05):
+    """
+    Open a vector store zero-copy with np.memmap and return (matrix, header).
+
+    A matrix that does not match its header is read once more after
+    retry_delay, since save_vector_store() may be between replacing the
+    .npy and replacing the header.
+    """
+    matrix, header, matches = _read_store(path)
+    if not matches:
+        time.sleep(retry_delay)
+        matrix, header, matches = _read_store(path)
+    if not matches:
+        raise ValueError(f"Vector store {path} does not match its header.")
+    return matrix, header
+
+
+def load_legacy_pickle(path):
+    """
+    Read a legacy task_8_embeddings.pkl (list of Python float lists) as (matrix, header)
+    """
+    with open(path, "rb") as f:
+        vectors = pickle.load(f)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(vectors), -1)
+    header = {
+        "format_version": 0,
+        "dtype": "float32",
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]) if matrix.size else 0,
+        "model": None,
+        "normalized": False,
+    }
+    return matrix, header
+
+
+def load_embeddings(path):
+    """
+    Load embeddings from a vector store, falling back to the legacy pickle.
+
+    Accepts either the .npy store path or a .pkl path. When the .npy store is
+    missing but a sibling .pkl exists, the pickle is read instead.
+    """
+    stem, ext = os.path.splitext(path)
+    if ext == ".pkl":
+        return load_legacy_pickle(path)
+    if not os.path.exists(path) and os.path.exists(stem + ".pkl"):
+        return load_legacy_pickle(stem + ".pkl")
+    return open_vector_store(path)
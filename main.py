@@ -1,4 +1,5 @@
 import argparse
+import json
 
 # import tasks
 
@@ -6,60 +7,293 @@ import tasks
 
 from dotenv import load_dotenv
 
+from helpers.usage import usage_scope
+
 
 load_dotenv()
 
 TASK_LIST = [f"task_{i}" for i in range(1, 13)]
 
-if __name__ == "__main__":
-    # create a parser for the command line arguments
-    # the parse only asks which task to run and then calls the main function
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--task",
-        "-t",
-        type=str,
-        default="task_11",
-        help="The task to run",
-        choices=TASK_LIST,
-    )
-    args = parser.parse_args()
+TASK_SOURCE = "tasks/{0}/{0}.py"
+GROUNDTRUTH = "outputs/task_4_groundtruth.json"
+NEEDLE = "outputs/task_5_needle_in_haystack.txt"
+TASK_7_FILES = [f"outputs/task_7_file_{i}.txt" for i in (1, 2, 3)]
+CHUNKS = "outputs/task_8_chunks.json"
+EMBEDDINGS = "outputs/task_8_embeddings.npy"
+RETRIEVAL = "outputs/task_9_retrieval_results.json"
+# independent pipeline stages run at once unless --jobs says otherwise
+DEFAULT_JOBS = 4
 
-    # create an if and else statements there are 12 tasks
-    if args.task == "task_1":
+
+def task_runners(args):
+    """
+    Map each task name to a callable that runs it with the command line options
+    """
+    return {
         # Task 1: Python Setup and Hello World in Cursor
-        tasks.task_1.task_1()
-    elif args.task == "task_2":
+        "task_1": lambda: tasks.task_1.task_1(),
         # Task 2: Basic LLM Prompting
-        tasks.task_2.task_2()
-    elif args.task == "task_3":
+        "task_2": lambda: tasks.task_2.task_2(),
         # Task 3: Structured LLM Prompting
-        tasks.task_3.task_3()
-    elif args.task == "task_4":
+        "task_3": lambda: tasks.task_3.task_3(),
         # Task 4: Create a User Query and Evidence
-        tasks.task_4.task_4()
-    elif args.task == "task_5":
+        "task_4": lambda: tasks.task_4.task_4(),
         # Task 5: Create the Needle in the Haystack Text File
-        tasks.task_5.task_5()
-    elif args.task == "task_6":
+        "task_5": lambda: tasks.task_5.task_5(),
         # Task 6: Evaluate the Recall of the Insight extraction using LLM-as-a-Judge (Predict and Evaluate)
-        tasks.task_6.task_6(mode="predict")
-        tasks.task_6.task_6(mode="evaluate")
-    elif args.task == "task_7":
+        "task_6": lambda: (
+            tasks.task_6.task_6(mode="predict"),
+            tasks.task_6.task_6(
+                mode="evaluate", judge=args.judge, check_agreement=args.judge_agreement
+            ),
+        ),
         # Task 7: Create Three Needle-in-Haystack files (two of them are distractor files, and one is the target file from task 5)
-        tasks.task_7.task_7()
-    elif args.task == "task_8":
+        "task_7": lambda: tasks.task_7.task_7(),
         # Task 8: Chunk and Embed All Files into a Vector Database
-        tasks.task_8.task_8()
-    elif args.task == "task_9":
+        "task_8": lambda: tasks.task_8.task_8(
+            task_dir=args.task_dir, quantize=args.quantize
+        ),
         # Task 9: Build the Retrieval System
-        tasks.task_9.task_9()
-    elif args.task == "task_10":
+        "task_9": lambda: tasks.task_9.task_9(search=args.search),
         # Task 10: Augmented Generation Stage Two of RAG
-        tasks.task_10.task_10()
-    elif args.task == "task_11":
+        "task_10": lambda: tasks.task_10.task_10(
+            judge=args.judge, check_agreement=args.judge_agreement
+        ),
         # Task 11: Build a Flask Deep Research App with Citations
-        tasks.task_11.task_11()
-    elif args.task == "task_12":
+        "task_11": lambda: tasks.task_11.task_11(),
         # Task 12: Add Follow Up Question Support
-        tasks.task_12.task_12()
+        "task_12": lambda: tasks.task_12.task_12(),
+    }
+
+
+def pipeline_stages(args):
+    """
+    The artifact-producing tasks with the outputs/ files they read and write.
+
+    Each task's own source file is an input, so editing a task reruns it.
+    Tasks 1, 11 and 12 (stub and web apps) are not pipeline stages.
+    """
+    from helpers.pipeline import Stage
+
+    runners = task_runners(args)
+    task_8_inputs = [args.task_dir] if args.task_dir else TASK_7_FILES
+    task_8_outputs = [
+        CHUNKS,
+        EMBEDDINGS,
+        "outputs/task_8_embeddings.json",
+        "outputs/task_8_manifest.json",
+        "outputs/task_8_bm25.npz",
+    ]
+    if args.quantize:
+        task_8_outputs.append("outputs/task_8_quantized.npz")
+
+    judge_params = {"judge": args.judge, "judge_agreement": args.judge_agreement}
+
+    declared = [
+        ("task_2", [], ["outputs/task_2.txt"], {}),
+        ("task_3", ["data/christmas.txt"], ["outputs/task_3.txt"], {}),
+        ("task_4", [], [GROUNDTRUTH, "outputs/task_4_groundtruth.txt"], {}),
+        ("task_5", [GROUNDTRUTH], [NEEDLE], {}),
+        (
+            "task_6",
+            [GROUNDTRUTH, NEEDLE],
+            ["outputs/task_5_insights.json", "outputs/task_6_evaluation_report.json"],
+            judge_params,
+        ),
+        ("task_7", [NEEDLE], TASK_7_FILES, {}),
+        (
+            "task_8",
+            task_8_inputs,
+            task_8_outputs,
+            {"task_dir": args.task_dir, "quantize": args.quantize},
+        ),
+        ("task_9", [GROUNDTRUTH, CHUNKS, EMBEDDINGS], [RETRIEVAL], {"search": args.search}),
+        (
+            "task_10",
+            [GROUNDTRUTH, RETRIEVAL],
+            ["outputs/task_10_prediction.json", "outputs/task_10_evaluation_report.json"],
+            judge_params,
+        ),
+    ]
+    return [
+        Stage(
+            name,
+            runners[name],
+            inputs=[TASK_SOURCE.format(name)] + inputs,
+            outputs=outputs,
+            params=params,
+        )
+        for name, inputs, outputs, params in declared
+    ]
+
+
+def run_pipeline(args):
+    import os
+    import time
+
+    from helpers.pipeline import Pipeline, print_summary
+
+    os.makedirs("outputs", exist_ok=True)
+    pipeline = Pipeline(pipeline_stages(args))
+    force = True if args.force == [] else set(args.force or ())
+    start = time.perf_counter()
+    jobs = DEFAULT_JOBS if args.jobs is None else args.jobs
+    results = pipeline.run(target=args.until, force=force, max_workers=jobs)
+    print_summary(results, wall_seconds=time.perf_counter() - start)
+    return results
+
+
+def run_deep_research(task_dir):
+    """
+    Answer a DRBench task's question through its subquestions over the Task 8 store
+    """
+    import helpers
+    from helpers.deep_research import deep_research, load_dr_question
+    from helpers.retrieval import VectorIndex
+    from helpers.vector_store import load_embeddings
+
+    question, subquestions = load_dr_question(task_dir)
+    chunk_records = helpers.load_json(CHUNKS)
+    embeddings, header = load_embeddings(EMBEDDINGS)
+    index = VectorIndex(embeddings, normalized=header["normalized"])
+    llm = helpers.LlmModel(model="deepseek-ai/DeepSeek-V3.1")
+
+    report = deep_research(question, subquestions, chunk_records, index, llm)
+    helpers.save_json(report, "outputs/deep_research.json")
+    for hop in report["hops"]:
+        print(
+            f"{hop['start_s']:>7.2f}s-{hop['end_s']:>6.2f}s  "
+            f"{len(hop['insights'])} insights  {hop['subquestion']}"
+        )
+    print(json.dumps(report["timing"], indent=4))
+    return report
+
+
+if __name__ == "__main__":
+    # create a parser for the command line arguments
+    # the parse asks which task to run (or which pipeline target to reach)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--task",
+        "-t",
+        type=str,
+        default="task_11",
+        help="The task to run",
+        choices=TASK_LIST,
+    )
+    parser.add_argument(
+        "--until",
+        type=str,
+        default=None,
+        choices=TASK_LIST[1:10],
+        help="Run the pipeline up to this task, skipping stages whose inputs are unchanged",
+    )
+    parser.add_argument(
+        "--force",
+        nargs="*",
+        default=None,
+        metavar="TASK",
+        help="With --until: rerun these stages even if up to date (all when empty)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help=f"With --until: how many independent stages may run at once (default {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--task-dir",
+        type=str,
+        default=None,
+        help="DRBench task folder to ingest in task_8 (e.g. data/DR0001)",
+    )
+    parser.add_argument(
+        "--judge",
+        type=str,
+        default="prescore",
+        choices=["prescore", "llm"],
+        help="Recall evaluation in task_6/task_10: embedding pre-scorer with LLM judge for ambiguous answers, or LLM judge only",
+    )
+    parser.add_argument(
+        "--judge-agreement",
+        action="store_true",
+        help="Also run the LLM-only judge and report its agreement with the pre-scorer",
+    )
+    parser.add_argument(
+        "--research",
+        type=str,
+        default=None,
+        metavar="TASK_DIR",
+        help="Answer a DRBench task's dr_question.json through its subquestions (e.g. data/DR0001)",
+    )
+    parser.add_argument(
+        "--eval",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Evaluate insight recall and distractor avoidance over the DR* task folders in DIR (e.g. data)",
+    )
+    parser.add_argument(
+        "--eval-workers",
+        type=int,
+        default=2,
+        help="With --eval: how many task folders are evaluated at once",
+    )
+    parser.add_argument(
+        "--judge-workers",
+        type=int,
+        default=4,
+        help="With --eval: how many judge calls may be in flight",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="With --eval: ignore the checkpoint of an earlier run",
+    )
+    parser.add_argument(
+        "--quantize",
+        nargs="+",
+        default=None,
+        choices=["int8", "binary"],
+        help="Quantized embedding copies for task_8 to store",
+    )
+    parser.add_argument(
+        "--search",
+        type=str,
+        default="exact",
+        choices=["exact", "ivf", "hybrid", "int8", "binary"],
+        help="Retrieval method for task_9",
+    )
+    args = parser.parse_args()
+    # pipeline options would otherwise be ignored without a pipeline run
+    if not args.until:
+        if args.force is not None:
+            parser.error("--force requires --until")
+        if args.jobs is not None:
+            parser.error("--jobs requires --until")
+
+    if args.until:
+        run_pipeline(args)
+    elif args.eval:
+        from helpers.drbench_eval import EvalRunner
+
+        with usage_scope("eval") as usage:
+            report = EvalRunner(
+                workers=args.eval_workers,
+                judge_workers=args.judge_workers,
+                judge=args.judge,
+            ).run(args.eval, resume=not args.no_resume)
+        summary = {k: v for k, v in report.items() if k != "per_task"}
+        print(json.dumps(summary, indent=4))
+        print(f"LLM usage for eval: {usage.snapshot()}")
+    elif args.research:
+        with usage_scope("deep_research") as usage:
+            run_deep_research(args.research)
+        print(f"LLM usage for deep research: {usage.snapshot()}")
+    else:
+        # record LLM token usage, latency and cost of the task (see helpers.usage)
+        with usage_scope(args.task) as usage:
+            task_runners(args)[args.task]()
+
+        if usage.calls:
+            print(f"LLM usage for {args.task}: {usage.snapshot()}")
@@ -1,12 +1,19 @@
-from . import task_1
-from . import task_2
-from . import task_3
-from . import task_4
-from . import task_5
-from . import task_6
-from . import task_7
-from . import task_8
-from . import task_9
-from . import task_10
-from . import task_11
-from . import task_12
+import importlib
+
+# task packages are imported on first use (tasks.task_8), so running one task
+# does not pay for the libraries every other task imports
+TASKS = tuple(f"task_{i}" for i in range(1, 13))
+
+__all__ = list(TASKS)
+
+
+def __getattr__(name):
+    if name in TASKS:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(TASKS))
@@ -1,28 +1,31 @@
 import helpers
 
 
-def task_10():
+def task_10(token_budget=1024, strategy="score", judge="prescore", check_agreement=False):
     """
     Goal:
         Combine retrieved chunks with the user query and generate an improved answer using the LLM with citations and evaluate the recall of the answer.
     Instructions:
         - Load the user query from the file outputs/task_4_groundtruth.json
-        - Load the chunks and embeddings from the outputs/task_8_chunks.json and outputs/task_8_embeddings.pkl
+        - Load the chunks and embeddings from the outputs/task_8_chunks.json and outputs/task_8_embeddings.npy
         - Load the retrieval results from the outputs/task_9_retrieval_results.json
-        - Combine the user query with the 3 most similar chunks and the 3 most different chunks
+        - Pack Task 9's candidate chunks into a token budget (merge overlapping neighbours, drop near-duplicates, fill greedily by score or MMR) and combine them with the user query
         - Generate an improved answer using the LLM
         - Save the improved answer to the outputs/task_10.txt
         - Provide structured output where each insight has a justification and citation (source file)
         - Evaluate recall using the same LLM-driven evaluation prompt from Task 6
+          (judge="prescore" only sends answers the embedding pre-scorer is unsure about)
     """
 
     import json
     from pathlib import Path
 
-    import os
-    from together import Together
     from dotenv import load_dotenv
 
+    from helpers.context_packer import pack_context
+    from helpers.rag import build_insight_prompt, parse_json_output
+    from helpers.recall_judge import evaluate_recall
+
     load_dotenv()
 
     query_path = Path("outputs/task_4_groundtruth.json")
@@ -58,105 +61,65 @@ def task_10():
         print("Task 9 retrieval results not found or invalid; cannot proceed.")
         return
 
-    nearest = retrieval.get("nearest_chunks", [])[:3]
-    furthest = retrieval.get("furthest_chunks", [])[:3]
+    # pack Task 9's wider candidate set down to the budget (older results only
+    # have the 3 nearest); the furthest chunks are token waste
+    candidates = retrieval.get("candidate_chunks") or retrieval.get("nearest_chunks", [])
+    packed_chunks, context_stats = pack_context(
+        candidates, token_budget=token_budget, strategy=strategy
+    )
+    print(
+        f"Packed context: {context_stats['packed_tokens']}/{token_budget} tokens, "
+        f"{context_stats['packed_chunks']} of {context_stats['input_chunks']} chunks "
+        f"({context_stats['input_tokens']} tokens before packing)"
+    )
 
-    context_entries = []
-    for entry in nearest + furthest:
-        chunk = entry["chunk"]
-        context_entries.append(
-            f"{chunk['chunk_id']} ({chunk.get('source_file', 'unknown')}): {chunk['text']}"
-        )
-
-    prompt = f"""
-    You are an analyst answering a research question based on retrieved evidence.
-    Generate at least three insights about the user query. Each insight must include a justification and a citation referencing the source file or chunk where the evidence came from.
-
-    User query:
-    {query_text}
-
-    Retrieved chunks:
-    {"".join(f"- {item}\\n" for item in context_entries)}
-
-    Return the output as JSON with the format:
-    {{
-        "insights": [
-            {{
-                "insight": "<answer>",
-                "justification": "<why this is true using the chunk text>",
-                "citation": "<source file or chunk_id>"
-            }}
-        ]
-    }}
-    
-    output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
-    """
+    prompt = build_insight_prompt(query_text, packed_chunks)
 
     try:
-        client = Together(api_key=os.getenv('TOGETHER_API_KEY'))
+        client = helpers.get_client("together")
         
-        response = client.chat.completions.create(
+        response = helpers.chat_completion(
+            client,
             model="deepseek-ai/DeepSeek-V3.1",
             messages=[{"role": "user", "content": prompt}]
         )
         output = response.choices[0].message.content
         
-        # Try to parse JSON
-        try:
-            structured_response = json.loads(output)
-        except json.JSONDecodeError:
-            # Extract JSON if wrapped in text
-            import re
-            json_match = re.search(r'\{.*\}', output, re.DOTALL)
-            if json_match:
-                structured_response = json.loads(json_match.group(0))
-            else:
-                raise ValueError("No JSON found in response")
+        # parse JSON, extracting it if wrapped in text
+        structured_response = parse_json_output(output)
         
         predicted_insights = structured_response.get("insights", [])
         predicted_insights_list = [item.get("insight", "") for item in predicted_insights]
 
-        evaluation_prompt = f"""
-        You are an evaluator.
-        User Query: {query_text}
-
-        Ground Truth Answers:
-        {json.dumps(groundtruth, indent=2)}
-
-        Predicted Insights:
-        {json.dumps(predicted_insights_list, indent=2)}
-
-        Compare the predicted insights with the ground truth answers.
-        Calculate the Recall score: (Number of correctly retrieved ground truth answers) / (Total number of ground truth answers).
-
-        Provide a concise justification for the score.
-
-        Return the output in JSON format:
-        {{
-            "recall_score": <float between 0 and 1>,
-            "justification": "<string>"
-        }}
-        
-        output only in raw json format that should be 1 valid dictionary, do not include any other text or comments.
-        """
-        
-        eval_response = client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-V3.1",
-            messages=[{"role": "user", "content": evaluation_prompt}]
+        def ask_judge(prompt):
+            eval_response = helpers.chat_completion(
+                client,
+                model="deepseek-ai/DeepSeek-V3.1",
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return eval_response.choices[0].message.content
+
+        evaluation = evaluate_recall(
+            query_text,
+            groundtruth,
+            predicted_insights_list,
+            ask_judge,
+            mode=judge,
+            check_agreement=check_agreement,
         )
-        eval_output = eval_response.choices[0].message.content
-        
-        try:
-            evaluation_report = json.loads(eval_output)
-        except json.JSONDecodeError:
-            json_match = re.search(r'\{.*\}', eval_output, re.DOTALL)
-            if json_match:
-                evaluation_report = json.loads(json_match.group(0))
-            else:
-                raise ValueError("No JSON found in eval response")
-        
+        evaluation_report = dict(
+            evaluation,
+            recall_score=evaluation["overall_recall"],
+            justification=evaluation["reasoning"],
+        )
+        print(
+            f"Recall {evaluation['overall_recall']:.2f} with "
+            f"{evaluation['judge_calls']} judge call(s)"
+        )
+
         evaluation_report["user_query"] = query_text
         structured_response["user_query"] = query_text
+        structured_response["context_stats"] = context_stats
         prediction_path.parent.mkdir(exist_ok=True)
 
         helpers.save_json(structured_response, prediction_path)
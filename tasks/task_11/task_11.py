@@ -1,12 +1,290 @@
-from flask import Flask, jsonify, render_template, request
+import json
+import threading
+import time
+
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 
 import helpers
+from helpers.ann import attach_ann
+from helpers.bm25 import attach_bm25
+from helpers.deep_research import deep_research
+from helpers.embedding_models import model_stats, warm_up
+from helpers.query_service import QueryService, QueryTimeout
+from helpers.rate_limit import rate_limit_stats
+from helpers.rag import build_insight_prompt, parse_insights
+from helpers.retrieval import VectorIndex
+from helpers.semantic_cache import SemanticCache, corpus_stamp, corpus_version
+from helpers.usage import run_totals, usage_scope
+from helpers.vector_store import load_embeddings
 
 app = Flask(__name__)
 
 CHUNK_PATH = "outputs/task_8_chunks.json"
-EMBEDDING_PATH = "outputs/task_8_embeddings.pkl"
+EMBEDDING_PATH = "outputs/task_8_embeddings.npy"
+ANN_PATH = "outputs/task_8_ann.npz"
+BM25_PATH = "outputs/task_8_bm25.npz"
+MANIFEST_PATH = "outputs/task_8_manifest.json"
+# a change to any of these (a Task 8 re-ingest) reloads the index and drops cached answers
+CORPUS_PATHS = (CHUNK_PATH, EMBEDDING_PATH, MANIFEST_PATH)
 OUTPUT_PATH = "outputs/task_11.json"
+GENERATION_MODEL = "deepseek-ai/DeepSeek-V3.1"
+TOP_K = 3
+# per-request retrieval timeout in seconds
+QUERY_TIMEOUT = 10.0
+
+_state = {}
+_state_lock = threading.Lock()
+
+
+def load_index():
+    """
+    Load the Task 8 chunk metadata and build the retrieval index over its embeddings
+    """
+    chunk_records = helpers.load_json(CHUNK_PATH)
+    embeddings, header = load_embeddings(EMBEDDING_PATH)
+    index = VectorIndex(embeddings, normalized=header["normalized"])
+    attach_ann(index, ANN_PATH)
+    attach_bm25(index, BM25_PATH)
+    return chunk_records, index
+
+
+def get_resources():
+    """
+    Return (chunk_records, index, llm), loading them once per process and
+    again whenever Task 8 rewrites the corpus files
+    """
+    with _state_lock:
+        stamp = corpus_stamp(CORPUS_PATHS)
+        if not _state or stamp != _state["stamp"]:
+            chunk_records, index = load_index()
+            if "service" in _state:
+                _state["service"].close()
+            _state["chunk_records"] = chunk_records
+            _state["index"] = index
+            _state["stamp"] = stamp
+            _state["corpus_version"] = corpus_version(CORPUS_PATHS)
+            # concurrent requests share micro-batched query embedding and scoring
+            _state["service"] = QueryService(chunk_records, index)
+            if "llm" not in _state:
+                _state["llm"] = helpers.LlmModel(model=GENERATION_MODEL)
+                _state["answer_cache"] = SemanticCache()
+            else:
+                _state["answer_cache"].invalidate(keep_version=_state["corpus_version"])
+    return _state["chunk_records"], _state["index"], _state["llm"]
+
+
+def get_service(with_version=False):
+    """
+    Return the process-wide QueryService, starting it on first use (and the
+    corpus version it searches, as (service, version), with with_version=True)
+    """
+    get_resources()
+    # read together, so a concurrent reload cannot pair one corpus's service
+    # with another's version
+    with _state_lock:
+        service, version = _state["service"], _state["corpus_version"]
+    service.start()
+    return (service, version) if with_version else service
+
+
+def retrieve_for_query(query_text, method="exact"):
+    """
+    Return (chunks, query embedding, corpus version) for a query: the top
+    chunks as flat chunk dicts with their score, and the version of the
+    corpus they were retrieved from
+    """
+    service, version = get_service(with_version=True)
+    nearest, embedding = service.query(
+        query_text, k=TOP_K, method=method, timeout=QUERY_TIMEOUT, with_embedding=True
+    )
+    chunks = [dict(entry["chunk"], score=entry["score"]) for entry in nearest]
+    return chunks, embedding, version
+
+
+def cached_answer(query_embedding, retrieved_chunks, version):
+    """
+    Return (cache key, cached insights or None) for a query and its retrieved chunks.
+
+    A paraphrase of an earlier question that retrieved the same chunks from
+    the same corpus version reuses its answer instead of calling the LLM.
+    version is the one retrieve_for_query() returned with the chunks.
+    """
+    key = ([chunk["chunk_id"] for chunk in retrieved_chunks], version)
+    entry = _state["answer_cache"].get(query_embedding, *key)
+    return key, None if entry is None else entry["answer"]
+
+
+def store_answer(query_text, query_embedding, key, insights, latency_s):
+    _state["answer_cache"].put(query_text, query_embedding, *key, insights, latency_s)
+
+
+def save_result(query_text, retrieved_chunks, insights):
+    result = {
+        "user_query": query_text,
+        "retrieved_chunks": retrieved_chunks,
+        "insights": insights,
+    }
+    helpers.save_json(result, OUTPUT_PATH)
+    return result
+
+
+def _read_query():
+    payload = request.get_json(silent=True) or {}
+    return str(payload.get("query", "")).strip()
+
+
+def _read_search_method():
+    # "exact" (default), "ivf" for the ANN index or "hybrid" for BM25 + cosine fusion
+    payload = request.get_json(silent=True) or {}
+    method = payload.get("search", "exact")
+    return method if method in ("exact", "ivf", "hybrid") else "exact"
+
+
+@app.route("/")
+def index():
+    return render_template("task_11_index.html")
+
+
+@app.route("/query", methods=["POST"])
+def query():
+    query_text = _read_query()
+    if not query_text:
+        return jsonify({"error": "Please provide a query."}), 400
+
+    try:
+        with usage_scope("task_11 /query") as usage:
+            retrieved_chunks, embedding, version = retrieve_for_query(
+                query_text, _read_search_method()
+            )
+            key, insights = cached_answer(embedding, retrieved_chunks, version)
+            cached = insights is not None
+            if not cached:
+                _, _, llm = get_resources()
+                start = time.perf_counter()
+                output = llm.prompt_llm(build_insight_prompt(query_text, retrieved_chunks))
+                insights = parse_insights(output)
+                store_answer(
+                    query_text, embedding, key, insights, time.perf_counter() - start
+                )
+    except QueryTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        print(f"Error in task_11 query: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    result = save_result(query_text, retrieved_chunks, insights)
+    return jsonify(dict(result, cached=cached, usage=usage.snapshot()))
+
+
+@app.route("/query/stream", methods=["POST"])
+def query_stream():
+    """
+    Stream a query as NDJSON (default) or server-sent events (?format=sse).
+
+    Events: "retrieval" with the chunks as soon as they are scored, "token"
+    for each piece of generated text, then "result" with the parsed insights
+    (also saved to OUTPUT_PATH) and the request's LLM usage, or "error".
+    A semantic cache hit sends no tokens and a "result" with cached=true.
+    """
+    query_text = _read_query()
+    if not query_text:
+        return jsonify({"error": "Please provide a query."}), 400
+    use_sse = request.args.get("format") == "sse"
+    method = _read_search_method()
+
+    def encode(event):
+        line = json.dumps(event)
+        return f"data: {line}\n\n" if use_sse else line + "\n"
+
+    def generate():
+        try:
+            with usage_scope("task_11 /query/stream") as usage:
+                retrieved_chunks, embedding, version = retrieve_for_query(
+                    query_text, method
+                )
+                yield encode({"type": "retrieval", "retrieved_chunks": retrieved_chunks})
+
+                key, insights = cached_answer(embedding, retrieved_chunks, version)
+                cached = insights is not None
+                if not cached:
+                    _, _, llm = get_resources()
+                    start = time.perf_counter()
+                    prompt = build_insight_prompt(query_text, retrieved_chunks)
+                    pieces = []
+                    for text in llm.prompt_llm(prompt, stream=True):
+                        pieces.append(text)
+                        yield encode({"type": "token", "text": text})
+                    insights = parse_insights("".join(pieces))
+                    store_answer(
+                        query_text, embedding, key, insights, time.perf_counter() - start
+                    )
+
+            result = save_result(query_text, retrieved_chunks, insights)
+            yield encode(
+                {"type": "result", **result, "cached": cached, "usage": usage.snapshot()}
+            )
+        except Exception as e:
+            print(f"Error in task_11 stream: {e}")
+            yield encode({"type": "error", "error": str(e)})
+
+    mimetype = "text/event-stream" if use_sse else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/research", methods=["POST"])
+def research():
+    """
+    Answer {"query", "subquestions": [...]} by retrieving for all subquestions
+    in one batch, answering them concurrently and synthesizing one answer
+    """
+    payload = request.get_json(silent=True) or {}
+    query_text = str(payload.get("query", "")).strip()
+    subquestions = [str(q).strip() for q in payload.get("subquestions", []) if str(q).strip()]
+    if not query_text:
+        return jsonify({"error": "Please provide a query."}), 400
+
+    try:
+        with usage_scope("task_11 /research") as usage:
+            chunk_records, index, llm = get_resources()
+            report = deep_research(
+                query_text,
+                subquestions,
+                chunk_records,
+                index,
+                llm,
+                model=get_service().model,
+                k=TOP_K,
+            )
+    except Exception as e:
+        print(f"Error in task_11 research: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(report, usage=usage.snapshot()))
+
+
+@app.route("/usage")
+def usage():
+    # LLM usage totals of this server process
+    return jsonify(run_totals())
+
+
+@app.route("/stats")
+def stats():
+    # retrieval batching, latency percentiles and throughput, answer cache hit
+    # rate, LLM queue wait and throttling, and embedding model load cost
+    service, version = get_service(with_version=True)
+    return jsonify(
+        dict(
+            service.stats(),
+            answer_cache=_state["answer_cache"].get_stats(),
+            rate_limits=rate_limit_stats(),
+            embedding_models=model_stats(),
+            corpus_version=version,
+        )
+    )
 
 
 def task_11():
@@ -19,7 +297,15 @@ def task_11():
         - You can copy paste the relevant code from those tasks into small helper functions here
         - Save the outputs in task_11.json
     """
-    # YOUR CODE HERE
+    # load the index and model before serving so the first request is not the cold one
+    get_resources()
+    for name, entry in warm_up()["models"].items():
+        print(
+            f"Embedding model {name}: loaded in {entry['load_seconds']:.2f}s, "
+            f"warm-up {entry['warmup_seconds'] or 0.0:.2f}s"
+        )
+    get_service()
+    app.run(host="127.0.0.1", port=5000, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
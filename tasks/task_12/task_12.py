@@ -1,12 +1,261 @@
+import threading
+
 from flask import Flask, jsonify, render_template, request
 
 import helpers
+from helpers.embedding_models import model_stats, warm_up
+from helpers.query_service import QueryService, QueryTimeout
+from helpers.rag import build_followup_prompt, build_insight_prompt, parse_insights
+from helpers.retrieval import VectorIndex, normalize_rows, top_k_indices
+from helpers.semantic_cache import corpus_stamp, corpus_version
+from helpers.sessions import SessionStore, new_session_id
+from helpers.usage import usage_scope
+from helpers.vector_store import load_embeddings
 
 app = Flask(__name__)
 
 CHUNK_PATH = "outputs/task_8_chunks.json"
-EMBEDDING_PATH = "outputs/task_8_embeddings.pkl"
+EMBEDDING_PATH = "outputs/task_8_embeddings.npy"
+MANIFEST_PATH = "outputs/task_8_manifest.json"
+# a change to any of these (a Task 8 re-ingest) reloads the index and retires
+# the sessions built on the old chunk rows
+CORPUS_PATHS = (CHUNK_PATH, EMBEDDING_PATH, MANIFEST_PATH)
 OUTPUT_PATH = "outputs/task_12.json"
+SESSION_SPILL_PATH = "outputs/task_12_sessions.sqlite"
+GENERATION_MODEL = "deepseek-ai/DeepSeek-V3.1"
+TOP_K = 3
+# rows kept per session for follow-ups to re-rank
+CANDIDATE_K = 20
+# a follow-up whose best candidate scores below this searches the whole index
+REUSE_MIN_SCORE = 0.3
+# weight of the previous question when re-ranking for a follow-up
+HISTORY_WEIGHT = 0.3
+QUERY_TIMEOUT = 10.0
+
+_state = {}
+_state_lock = threading.Lock()
+_followup_stats = {
+    "first_queries": 0,
+    "followups": 0,
+    "stale_sessions": 0,
+    "reused_candidates": 0,
+    "full_searches": 0,
+    "context_chunks_sent": 0,
+    "context_chunks_skipped": 0,
+}
+_followup_lock = threading.Lock()
+
+
+def load_index():
+    """
+    Load the Task 8 chunk metadata and build the retrieval index over its embeddings
+    """
+    chunk_records = helpers.load_json(CHUNK_PATH)
+    embeddings, header = load_embeddings(EMBEDDING_PATH)
+    return chunk_records, VectorIndex(embeddings, normalized=header["normalized"])
+
+
+def get_resources():
+    """
+    Return (chunk_records, index, llm, sessions), loading them once per process
+    and again whenever Task 8 rewrites the corpus files
+    """
+    with _state_lock:
+        stamp = corpus_stamp(CORPUS_PATHS)
+        if not _state or stamp != _state["stamp"]:
+            chunk_records, index = load_index()
+            if "service" in _state:
+                _state["service"].close()
+            _state["chunk_records"] = chunk_records
+            _state["index"] = index
+            _state["stamp"] = stamp
+            _state["corpus_version"] = corpus_version(CORPUS_PATHS)
+            _state["row_of"] = {c["chunk_id"]: row for row, c in enumerate(chunk_records)}
+            _state["service"] = QueryService(chunk_records, index)
+            if "llm" not in _state:
+                _state["llm"] = helpers.LlmModel(model=GENERATION_MODEL)
+                _state["sessions"] = SessionStore(spill_path=SESSION_SPILL_PATH)
+    return _state["chunk_records"], _state["index"], _state["llm"], _state["sessions"]
+
+
+def get_service():
+    """
+    Return the process-wide QueryService over the Task 8 store, starting it on first use
+    """
+    get_resources()
+    return _state["service"].start()
+
+
+def _count(name, amount=1):
+    with _followup_lock:
+        _followup_stats[name] += amount
+
+
+def rerank_candidates(index, rows, query_embedding, k):
+    """
+    Score only a session's candidate rows against a query; returns [(row, score)] best first
+    """
+    if not rows:
+        return []
+    scores = index.matrix[rows] @ normalize_rows(query_embedding)
+    return [(rows[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+
+def select_chunks(session, query_embedding, searched, index, row_of):
+    """
+    Return (nearest (row, score) pairs, whether the session's candidates were reused).
+
+    searched is the QueryService's whole-index result for the question. A
+    follow-up re-ranks the rows retrieved for earlier turns, scored against
+    the new question blended with the previous one. If none of them is close
+    enough, the searched chunks are used and their rows join the candidates.
+    """
+    if session["turns"]:
+        previous = normalize_rows(session["turns"][-1]["embedding"])
+        blended = normalize_rows(query_embedding) + HISTORY_WEIGHT * previous
+        nearest = rerank_candidates(index, session["candidate_rows"], blended, TOP_K)
+        if nearest and nearest[0][1] >= REUSE_MIN_SCORE:
+            return nearest, True
+
+    candidates = [(row_of[e["chunk"]["chunk_id"]], e["score"]) for e in searched]
+    known = set(session["candidate_rows"])
+    session["candidate_rows"] += [row for row, _ in candidates if row not in known]
+    return candidates[:TOP_K], False
+
+
+def answer_query(query_text, session_id=None):
+    """
+    Answer a question or a follow-up in a session and return the turn result.
+
+    Only chunks the session has not already sent to the LLM are added to the
+    prompt; earlier evidence is carried by the previous questions and insights.
+    Turns of the same session are answered one at a time, so concurrent
+    follow-ups each see and keep the other's turn.
+    """
+    if not session_id:
+        return _answer_turn(query_text, None)
+    with get_resources()[3].lock(session_id):
+        return _answer_turn(query_text, session_id)
+
+
+def _answer_turn(query_text, session_id):
+    chunk_records, index, llm, sessions = get_resources()
+    version = _state["corpus_version"]
+    session = sessions.get(session_id) if session_id else None
+    if session is not None and session.get("corpus_version") != version:
+        # its candidate rows index a corpus that has since been re-ingested
+        sessions.delete(session_id)
+        _count("stale_sessions")
+        session = None
+    if session is None:
+        session_id = new_session_id()
+        session = {
+            "corpus_version": version,
+            "turns": [],
+            "candidate_rows": [],
+            "sent_chunk_ids": [],
+        }
+    followup = bool(session["turns"])
+    _count("followups" if followup else "first_queries")
+
+    # encode and search the whole index in the service's micro-batches, so
+    # concurrent requests share one encode call and one scoring pass
+    searched, query_embedding = get_service().query(
+        query_text, k=CANDIDATE_K, timeout=QUERY_TIMEOUT, with_embedding=True
+    )
+    nearest, reused = select_chunks(
+        session, query_embedding, searched, index, _state["row_of"]
+    )
+    _count("reused_candidates" if reused else "full_searches")
+
+    retrieved_chunks = [dict(chunk_records[row], score=score) for row, score in nearest]
+    sent = set(session["sent_chunk_ids"])
+    new_chunks = [c for c in retrieved_chunks if c["chunk_id"] not in sent]
+    _count("context_chunks_sent", len(new_chunks))
+    _count("context_chunks_skipped", len(retrieved_chunks) - len(new_chunks))
+
+    if followup:
+        prompt = build_followup_prompt(query_text, new_chunks, session["turns"])
+    else:
+        prompt = build_insight_prompt(query_text, new_chunks)
+    insights = parse_insights(llm.prompt_llm(prompt))
+
+    session["sent_chunk_ids"] += [c["chunk_id"] for c in new_chunks]
+    session["turns"].append(
+        {
+            "query": query_text,
+            "embedding": [round(float(x), 6) for x in query_embedding],
+            "chunk_ids": [c["chunk_id"] for c in retrieved_chunks],
+            "context_chunk_ids": [c["chunk_id"] for c in new_chunks],
+            "reused_candidates": reused,
+            "insights": insights,
+        }
+    )
+    sessions.put(session_id, session)
+    save_session(session_id, session)
+    return {
+        "session_id": session_id,
+        "turn": len(session["turns"]),
+        "user_query": query_text,
+        "retrieved_chunks": retrieved_chunks,
+        "context_chunk_ids": [c["chunk_id"] for c in new_chunks],
+        "reused_candidates": reused,
+        "insights": insights,
+    }
+
+
+def save_session(session_id, session):
+    # the conversation so far, without the stored query embeddings
+    turns = [
+        {key: value for key, value in turn.items() if key != "embedding"}
+        for turn in session["turns"]
+    ]
+    helpers.save_json({"session_id": session_id, "turns": turns}, OUTPUT_PATH)
+
+
+@app.route("/")
+def index():
+    return render_template("task_12_index.html")
+
+
+@app.route("/query", methods=["POST"])
+def query():
+    payload = request.get_json(silent=True) or {}
+    query_text = str(payload.get("query", "")).strip()
+    if not query_text:
+        return jsonify({"error": "Please provide a query."}), 400
+
+    try:
+        with usage_scope("task_12 /query") as usage:
+            result = answer_query(query_text, payload.get("session_id") or None)
+    except QueryTimeout as e:
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        print(f"Error in task_12 query: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(result, usage=usage.snapshot()))
+
+
+@app.route("/sessions/<session_id>", methods=["DELETE"])
+def end_session(session_id):
+    get_resources()[3].delete(session_id)
+    return jsonify({"session_id": session_id, "deleted": True})
+
+
+@app.route("/stats")
+def stats():
+    # session store hit rate and evictions, follow-up reuse, retrieval latency
+    # and embedding model load cost
+    with _followup_lock:
+        followups = dict(_followup_stats)
+    return jsonify(
+        {
+            "sessions": get_resources()[3].get_stats(),
+            "followups": followups,
+            "retrieval": get_service().stats(),
+            "embedding_models": model_stats(),
+        }
+    )
 
 
 def task_12():
@@ -20,4 +269,16 @@ def task_12():
         - It should be a notebook style so the search bar should re-appear after the user has seen the insights and citations everytime
         - Save the outputs in task_12.json
     """
-    # YOUR CODE HERE
+    # load the index and model before serving so the first request is not the cold one
+    get_resources()
+    for name, entry in warm_up()["models"].items():
+        print(
+            f"Embedding model {name}: loaded in {entry['load_seconds']:.2f}s, "
+            f"warm-up {entry['warmup_seconds'] or 0.0:.2f}s"
+        )
+    get_service()
+    app.run(host="127.0.0.1", port=5000, debug=False, threaded=True)
+
+
+if __name__ == "__main__":
+    task_12()
@@ -1,6 +1,4 @@
-import os
 import helpers
-from together import Together
 from dotenv import load_dotenv
 
 
@@ -19,9 +17,10 @@ def task_2():
     )
 
     try:
-        client = Together(api_key=os.getenv('TOGETHER_API_KEY'))
+        client = helpers.get_client("together")
         
-        response = client.chat.completions.create(
+        response = helpers.chat_completion(
+            client,
             model="deepseek-ai/DeepSeek-V3.1",
             messages=[
                 {
@@ -1,7 +1,5 @@
 import json
-import os
 import helpers
-from together import Together
 from dotenv import load_dotenv
 
 
@@ -46,9 +44,10 @@ Do not include any additional text, explanations, or formatting outside the JSON
 """
     
     try:
-        client = Together(api_key=os.getenv('TOGETHER_API_KEY'))
+        client = helpers.get_client("together")
         
-        response = client.chat.completions.create(
+        response = helpers.chat_completion(
+            client,
             model="deepseek-ai/DeepSeek-V3.1",
             messages=[
                 {
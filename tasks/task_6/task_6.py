@@ -1,11 +1,9 @@
 import helpers
 import json
-import os
-from together import Together
 from dotenv import load_dotenv
 
 
-def task_6(mode="evaluate"):
+def task_6(mode="evaluate", judge="prescore", check_agreement=False):
     """
     Goal:
         Evaluate the Recall of the Insight extraction using LLM-as-a-Judge (Predict and Evaluate)
@@ -15,6 +13,9 @@ def task_6(mode="evaluate"):
         - Load the predicted insights from the file outputs/task_5_insights.json
         - Evaluate the recall of the predicted insights using the groundtruth answers
         - Save the evaluation report to the file outputs/task_6_evaluation_report.json
+        - judge="prescore" decides clear matches and misses with embeddings and only asks
+          the LLM judge about the ambiguous answers (judge="llm" asks it about all of them);
+          check_agreement=True also runs the pure LLM judge and reports the agreement
     """
     load_dotenv()
     
@@ -54,8 +55,9 @@ Provide a list of insights that are direct, quantitative, and relevant to the qu
 """
         
         try:
-            client = Together(api_key=os.getenv('TOGETHER_API_KEY'))
-            response = client.chat.completions.create(
+            client = helpers.get_client("together")
+            response = helpers.chat_completion(
+                client,
                 model="deepseek-ai/DeepSeek-V3.1",
                 messages=[{"role": "user", "content": prompt}]
             )
@@ -97,36 +99,42 @@ Provide a list of insights that are direct, quantitative, and relevant to the qu
             print("Predicted insights file not found. Run predict mode first.")
             return
         
-        # Use LLM to evaluate recall
-        prompt = f"""
-Evaluate the recall of the predicted insights compared to the groundtruth answers.
-
-Groundtruth Answers:
-{json.dumps(groundtruth_answers, indent=2)}
-
-Predicted Insights:
-{json.dumps(predicted_insights, indent=2)}
+        # items may be plain strings or {"insight": ...} objects
+        insight_texts = [
+            item.get("insight", "") if isinstance(item, dict) else str(item)
+            for item in (
+                predicted_insights.get("insights", [])
+                if isinstance(predicted_insights, dict)
+                else predicted_insights
+            )
+        ]
 
-For each groundtruth answer, determine if it is adequately covered by the predicted insights. Provide a score from 0 to 1 for each, where 1 means fully covered, 0 means not covered.
+        try:
+            from helpers.recall_judge import evaluate_recall
 
-Then, calculate the overall recall as the average score.
+            client = helpers.get_client("together")
 
-Return ONLY a valid JSON object with:
-- "individual_scores": a list of scores for each groundtruth answer
-- "overall_recall": the average score
-- "reasoning": a brief explanation
+            def ask_judge(prompt):
+                response = helpers.chat_completion(
+                    client,
+                    model="deepseek-ai/DeepSeek-V3.1",
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                return response.choices[0].message.content
 
-Do not include any additional text.
-"""
-        
-        try:
-            client = Together(api_key=os.getenv('TOGETHER_API_KEY'))
-            response = client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-V3.1",
-                messages=[{"role": "user", "content": prompt}]
+            evaluation = evaluate_recall(
+                groundtruth.get("user_query", ""),
+                groundtruth_answers,
+                insight_texts,
+                ask_judge,
+                mode=judge,
+                check_agreement=check_agreement,
             )
-            evaluation = json.loads(response.choices[0].message.content)
-            
+            print(
+                f"Recall {evaluation['overall_recall']:.2f} with "
+                f"{evaluation['judge_calls']} judge call(s)"
+            )
+
             # Save evaluation report
             with open("outputs/task_6_evaluation_report.json", "w") as f:
                 json.dump(evaluation, f, indent=4)
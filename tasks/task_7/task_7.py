@@ -16,8 +16,13 @@ def task_7():
 
     try:
         llm = helpers.LlmModel()
-        distractor_one = _generate_distractor(llm, base_passage, "Apparel")
-        distractor_two = _generate_distractor(llm, base_passage, "Home goods")
+        # the two distractors are independent, so generate them concurrently
+        distractor_one, distractor_two = llm.prompt_many(
+            [
+                _distractor_prompt(base_passage, "Apparel"),
+                _distractor_prompt(base_passage, "Home goods"),
+            ]
+        )
     except Exception as e:
         print(f"LLM generation failed: {e}. Using simple replacements.")
         distractor_one = base_passage.replace("Electronics", "Clothing")
@@ -27,8 +32,8 @@ def task_7():
     helpers.save_txt(distractor_two, "outputs/task_7_file_3.txt")
 
 
-def _generate_distractor(llm, base_passage, category_name):
-    prompt = f"""
+def _distractor_prompt(base_passage, category_name):
+    return f"""
 Take inspiration from the style of the passage below (three sections, bolded headings, narrative tone)
 but create a completely new piece that focuses on {category_name}. Do not reuse the original facts,
 metrics, or conclusions. 
@@ -41,5 +46,4 @@ Original passage for reference:
 {base_passage}
 
 Return only the new passage text you generate.
-"""
-    return llm.prompt_llm(prompt)
\ No newline at end of file
+"""
\ No newline at end of file
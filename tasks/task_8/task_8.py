@@ -1,69 +1,144 @@
 import helpers
 
+# below this many chunks exact search is already fast enough
+ANN_MIN_CHUNKS = 20000
 
-def task_8():
+
+def task_8(task_dir=None, build_ann=None, quantize=None):
     """
     Goal:
         Chunk the three needle-in-haystack files, embed every chunk, and save the data for retrieval.
     Instructions:
         - Load the three needle-in-haystack files from the outputs/task_7_file_1.txt, outputs/task_7_file_2.txt, and outputs/task_7_file_3.txt
-        - Chunk the three files into chunks of 64 tokens with 12 token overlap
+        - Chunk the three files into chunks of 64 tokens with 12 token overlap (tiktoken cl100k_base)
         - Embed each chunk using Sentence Transformers
-        - Save the chunks and embeddings to the outputs/task_8_chunks.json and outputs/task_8_embeddings.pkl
+        - Save the chunks and embeddings to the outputs/task_8_chunks.json and the outputs/task_8_embeddings.npy vector store
+        - Only re-embed files and chunks that changed since the last run (tracked in outputs/task_8_manifest.json)
+        - With task_dir (e.g. data/DR0001), ingest every document of that DRBench task folder instead
+        - Build an IVF ANN index (outputs/task_8_ann.npz) when build_ann is True, or by default once there are ANN_MIN_CHUNKS chunks
+        - Build a BM25 inverted index over the chunk texts (outputs/task_8_bm25.npz) for hybrid retrieval
+        - Store int8 and/or binary quantized copies of the embeddings (outputs/task_8_quantized.npz) when quantize lists them
     """
 
-    import json
     import os
-    import pickle
     from pathlib import Path
 
-    from sentence_transformers import SentenceTransformer
+    from helpers.ann import IVFIndex
+    from helpers.bm25 import BM25Index
+    from helpers.ingest import (
+        IncrementalIngest,
+        file_sha256,
+        load_previous_run,
+        save_manifest,
+        text_sha256,
+    )
+    from helpers.quantization import QuantizedIndex
+    from helpers.vector_store import save_vector_store
 
     chunk_size = 64
     overlap = 12
+    model_name = "all-MiniLM-L6-v2"
     sources = [
         Path("outputs/task_7_file_1.txt"),
         Path("outputs/task_7_file_2.txt"),
         Path("outputs/task_7_file_3.txt"),
     ]
-    chunk_records = []
-    chunk_texts = []
-
-    # Split each source into fixed-size word buckets and record metadata.
-    for path in sources:
-        if not path.exists():
-            raise FileNotFoundError(f"{path} not found. Run task 7 first.")
-
-        text = helpers.load_txt(str(path)).strip()
-        if not text:
-            continue
-
-        words = text.split()
-        step = chunk_size - overlap
-        for idx in range(0, len(words), step):
-            chunk_words = words[idx : idx + chunk_size]
-            chunk_text = " ".join(chunk_words).strip()
-            if not chunk_text:
+    chunks_path = "outputs/task_8_chunks.json"
+    store_path = "outputs/task_8_embeddings.npy"
+    manifest_path = "outputs/task_8_manifest.json"
+    ann_path = "outputs/task_8_ann.npz"
+    bm25_path = "outputs/task_8_bm25.npz"
+    quantized_path = "outputs/task_8_quantized.npz"
+
+    settings = {
+        "model": model_name,
+        "chunker": "tiktoken/cl100k_base",
+        "chunk_size": chunk_size,
+        "overlap": overlap,
+        "normalized": True,
+    }
+    previous = load_previous_run(manifest_path, chunks_path, store_path, settings)
+    ingest = IncrementalIngest(previous, settings)
+
+    if task_dir:
+        # Stream parsed documents from the task folder; each document is tracked
+        # in the manifest like a file, keyed by the hash of its text.
+        from helpers.corpus import iter_document_chunks, iter_documents
+
+        for document in iter_documents(task_dir):
+            sha = text_sha256(document["text"])
+            if ingest.unchanged_file(document["doc_id"], sha):
                 continue
+            records = list(iter_document_chunks([document], chunk_size, overlap))
+            ingest.add_file(document["doc_id"], sha, records)
+    else:
+        # Reuse unchanged files as-is and re-chunk only new or changed ones.
+        for path in sources:
+            if not path.exists():
+                raise FileNotFoundError(f"{path} not found. Run task 7 first.")
 
-            chunk_record = {
-                "chunk_id": f"{path.name}_{idx // chunk_size}",
-                "source_file": path.name,
-                "chunk_index": idx // chunk_size,
-                "text": chunk_text,
-            }
-            chunk_records.append(chunk_record)
-            chunk_texts.append(chunk_text)
+            sha = file_sha256(path)
+            if ingest.unchanged_file(path.name, sha):
+                continue
+            ingest.add_file(path.name, sha, _chunk_file(path, chunk_size, overlap))
+
+    if not ingest.records:
+        raise ValueError(f"No content found in {task_dir or 'Task 7 outputs'}.")
 
-    if not chunk_records:
-        raise ValueError("No content found in Task 7 outputs.")
+    # Embed only the chunks that have no reusable vector.
+    new_vectors = []
+    if ingest.pending_texts:
+        from helpers.embedding_models import get_embedding_model
 
-    # Embed each chunk using Sentence Transformers.
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    embeddings = [vector.tolist() for vector in model.encode(chunk_texts)]
+        model = get_embedding_model(model_name)
+        new_vectors = model.encode(
+            ingest.pending_texts, convert_to_numpy=True, normalize_embeddings=True
+        )
+    embeddings = ingest.build_matrix(new_vectors)
 
-    # Persist chunks metadata and embeddings to disk.
+    # Persist chunks metadata, embeddings and the manifest to disk.
     output_dir = Path("outputs")
     output_dir.mkdir(exist_ok=True)
-    helpers.save_json(chunk_records, "outputs/task_8_chunks.json")
-    helpers.save_pickle(embeddings, "outputs/task_8_embeddings.pkl")
\ No newline at end of file
+    helpers.save_json(ingest.records, chunks_path)
+    save_vector_store(embeddings, store_path, model_name, normalized=True)
+    save_manifest(ingest.manifest(), manifest_path)
+
+    # The lexical index is cheap to build, so rebuild it from every chunk text.
+    BM25Index.build(record["text"] for record in ingest.records).save(bm25_path)
+
+    # An ANN index must always match the store, so rebuild or drop it.
+    if build_ann or (build_ann is None and len(embeddings) >= ANN_MIN_CHUNKS):
+        IVFIndex.build(embeddings).save(ann_path)
+    elif os.path.exists(ann_path):
+        os.remove(ann_path)
+    if quantize:
+        QuantizedIndex.build(embeddings, kinds=quantize).save(quantized_path)
+    elif os.path.exists(quantized_path):
+        os.remove(quantized_path)
+
+    report = ingest.report()
+    print(
+        f"Chunks: {report['total_chunks']} total, {report['reused_chunks']} reused, "
+        f"{report['recomputed_chunks']} recomputed, {report['dropped_rows']} stale rows dropped"
+    )
+    return report
+
+
+def _chunk_file(path, chunk_size, overlap):
+    # Stream a source through the token chunker and record metadata.
+    from helpers.chunker import iter_file_chunks
+
+    chunk_records = []
+    for chunk in iter_file_chunks(path, chunk_size, overlap):
+        chunk_records.append(
+            {
+                "chunk_id": f"{path.name}_{chunk['chunk_index']}",
+                "source_file": path.name,
+                "chunk_index": chunk["chunk_index"],
+                "start_char": chunk["start_char"],
+                "end_char": chunk["end_char"],
+                "token_count": chunk["token_count"],
+                "text": chunk["text"],
+            }
+        )
+    return chunk_records
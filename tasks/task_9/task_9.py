@@ -1,4 +1,4 @@
-def task_9():
+def task_9(search="exact", candidate_k=20):
     """
     Goal:
         Retrieve the 3 closest and 3 furthest chunks for a query and log their scores.
@@ -7,18 +7,25 @@ def task_9():
         - Load the chunk metadata and embeddings from Task 8 outputs
         - Embed the query, score every chunk, and print the top 3 closest chunks
         - Save the query, its nearest chunks, and the most different chunks (with metadata) to outputs/task_9_retrieval_results.json
+        - search="ivf" takes the nearest chunks from the Task 8 ANN index when one exists (exact search otherwise)
+        - search="hybrid" fuses cosine and BM25 rankings (Task 8 BM25 index) with reciprocal-rank fusion
+        - search="int8" or "binary" scans the Task 8 quantized codes and rescores a shortlist in float32
+        - Also save the candidate_k nearest chunks for Task 10 to pack down to its token budget
     """
 
     import json
-    import math
-    import pickle
     from pathlib import Path
 
-    from sentence_transformers import SentenceTransformer
+    from helpers.ann import attach_ann
+    from helpers.bm25 import attach_bm25
+    from helpers.embedding_models import get_embedding_model
+    from helpers.quantization import attach_quantized
+    from helpers.retrieval import VectorIndex, search_chunks
+    from helpers.vector_store import load_embeddings
 
     query_path = Path("outputs/task_4_groundtruth.json")
     chunks_path = Path("outputs/task_8_chunks.json")
-    embeddings_path = Path("outputs/task_8_embeddings.pkl")
+    embeddings_path = Path("outputs/task_8_embeddings.npy")
     result_path = Path("outputs/task_9_retrieval_results.json")
 
     try:
@@ -49,38 +56,38 @@ def task_9():
     # read the chunk metadata and precomputed embeddings from Task 8
     with open(chunks_path) as chunk_file:
         chunk_records = json.load(chunk_file)
-    with open(embeddings_path, "rb") as emb_file:
-        embeddings = pickle.load(emb_file)
+    # memory-mapped float32 store (falls back to the legacy pickle)
+    embeddings, store_header = load_embeddings(str(embeddings_path))
 
-    if not chunk_records or not embeddings or len(chunk_records) != len(embeddings):
+    if not chunk_records or not len(embeddings) or len(chunk_records) != len(embeddings):
         raise ValueError("Mismatch between chunk metadata and embeddings.")
 
     try:
         # embed the query with the same model used for chunks
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        query_embedding = model.encode(query_text, convert_to_numpy=True).tolist()
+        model = get_embedding_model("all-MiniLM-L6-v2")
+        query_embedding = model.encode(query_text, convert_to_numpy=True)
     except Exception as e:
         print(f"Error embedding query: {e}")
         raise
 
-    # compute cosine similarity between two vectors
-    def cosine_similarity(a, b):
-        dot = sum(x * y for x, y in zip(a, b))
-        norm_a = math.sqrt(sum(x * x for x in a))
-        norm_b = math.sqrt(sum(y * y for y in b))
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return dot / (norm_a * norm_b)
-
-    scored_chunks = []
-    for chunk_meta, chunk_vector in zip(chunk_records, embeddings):
-        score = cosine_similarity(chunk_vector, query_embedding)
-        scored_chunks.append({"score": score, "chunk": chunk_meta})
-
-    # sort to expose best/worst matches
-    scored_chunks.sort(key=lambda item: item["score"], reverse=True)
-    closest = scored_chunks[:3]
-    furthest = scored_chunks[-3:][::-1]
+    # score every chunk in one matrix-vector product and keep the best/worst matches
+    index = VectorIndex(embeddings, normalized=store_header["normalized"])
+    if search == "ivf":
+        attach_ann(index, "outputs/task_8_ann.npz")
+    elif search == "hybrid":
+        attach_bm25(index, "outputs/task_8_bm25.npz")
+    elif search in ("int8", "binary"):
+        attach_quantized(index, "outputs/task_8_quantized.npz")
+    candidates, furthest = search_chunks(
+        index,
+        chunk_records,
+        query_embedding,
+        k=max(candidate_k, 3),
+        furthest_k=3,
+        method=search,
+        query_text=query_text,
+    )
+    closest = candidates[:3]
 
     print("Top 3 relevant chunks:")
     for entry in closest:
@@ -92,6 +99,7 @@ def task_9():
     results = {
         "user_query": query_text,
         "nearest_chunks": closest,
+        "candidate_chunks": candidates,
         "furthest_chunks": furthest,
     }
 